@@ -1,7 +1,7 @@
 
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from config import llm
+from config import llm_for
 from agents.generate_agent import ToGenerate
 from langchain_core.messages import ToolMessage, AIMessage
 from .index import ToWebSearch
@@ -282,6 +282,6 @@ content_grader_prompt = ChatPromptTemplate.from_messages(
 content_grader_prompt_safe_tools = []
 content_grader_prompt_sensitive_tools = []
 content_grader_prompt_tools = content_grader_prompt_safe_tools + content_grader_prompt_sensitive_tools
-content_grader_runnable = content_grader_prompt | llm.bind_tools(
+content_grader_runnable = content_grader_prompt | llm_for("content_grader").bind_tools(
     content_grader_prompt_tools + [ToGenerate, ToWebSearch], tool_choice="any"
 )
\ No newline at end of file
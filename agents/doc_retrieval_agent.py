@@ -1,7 +1,7 @@
 
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from config import llm
+from config import llm_for
 from tools import retrieve_from_doc
 from agents.filter_agent import ToFilter
 from langchain_core.tools import tool
@@ -107,6 +107,6 @@ doc_retrieval_prompt = ChatPromptTemplate.from_messages(
 doc_retrieval_safe_tools = [retrieve_from_doc]
 doc_retrieval_sensitive_tools = []
 doc_retrieval_tools = doc_retrieval_safe_tools + doc_retrieval_sensitive_tools
-doc_retrieval_runnable = doc_retrieval_prompt | llm.bind_tools(
+doc_retrieval_runnable = doc_retrieval_prompt | llm_for("doc_retrieval").bind_tools(
     doc_retrieval_tools + [ToFilter], tool_choice="any"
 )
\ No newline at end of file
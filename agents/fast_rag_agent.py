@@ -0,0 +1,55 @@
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field
+from config import llm_for
+
+
+class FastRagAnswer(BaseModel):
+    """
+    Answer to the user's query produced in one pass over the retrieved content.
+
+    **Field Descriptions:**
+    - `sufficient`: Whether the retrieved content, once the noise is ignored, is enough to answer the query.
+    - `answer`: The final markdown answer, based only on the retrieved content. Empty when `sufficient` is false.
+    """
+
+    sufficient: bool = Field(
+        description="True if the retrieved content contains enough relevant information to answer the user query."
+    )
+    answer: str = Field(
+        default="",
+        description="The final answer in markdown, using only the retrieved content. Empty if the content is insufficient."
+    )
+
+
+# Fast RAG assistant: filter, grade and generate in a single structured call
+
+fast_rag_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "📌 **Task Overview:**\n"
+            "You receive a `user_query` and raw `retrieved_content` from a food document database. "
+            "In one pass you must clean the content, judge whether it answers the query, and write the answer.\n\n"
+
+            "### 🔍 **Step 1: Filter (silently)**\n"
+            "   - Ignore placeholders (e.g., 'NO RESULT!'), symbols, links, page numbers, broken tables and other non-informative fragments.\n"
+            "   - Do NOT infer missing information or fill gaps in fragmented sentences.\n\n"
+
+            "### 🔍 **Step 2: Grade Sufficiency**\n"
+            "   - Set `sufficient` to true if the cleaned content **logically addresses the user query**; minor missing details are fine.\n"
+            "   - Food-related queries do NOT require exhaustive details—a dish's name, ingredients and preparation can be enough.\n"
+            "   - Set `sufficient` to false only if a **critical piece of information** is missing, or the content is empty or unrelated.\n"
+            "   - Do NOT accept content just because it contains similar words—verify that it actually answers the question.\n\n"
+
+            "### 🔍 **Step 3: Generate the Answer**\n"
+            "   - If `sufficient` is true, write `answer` using the cleaned content as the **sole source of truth**.\n"
+            "   - Do not mention or imply that your answer is based on provided content.\n"
+            "   - Be complete, accurate, polite and clear, formatted as beautiful markdown; sparing food emojis like 🍕🥗 are welcome.\n"
+            "   - If `sufficient` is false, leave `answer` empty.\n"
+        ),
+        ("user", "user_query: {user_query}\n\nretrieved_content:\n{retrieved_content}"),
+    ]
+)
+
+
+fast_rag_runnable = fast_rag_prompt | llm_for("fast_rag").with_structured_output(FastRagAnswer, include_raw=True)
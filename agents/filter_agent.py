@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from config import llm
+from config import llm_for
 from agents.content_grader_agent import ToGradeContent
 
 
@@ -91,6 +91,6 @@ filter_prompt = ChatPromptTemplate.from_messages(
 filter_safe_tools = []
 filter_sensitive_tools = []
 filter_tools = filter_safe_tools + filter_sensitive_tools
-filter_runnable = filter_prompt | llm.bind_tools(
+filter_runnable = filter_prompt | llm_for("filter").bind_tools(
     filter_tools + [ToGradeContent], tool_choice="any"
 )
\ No newline at end of file
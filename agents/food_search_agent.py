@@ -1,7 +1,7 @@
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 from typing import Optional
-from config import llm
+from config import llm_for
 from tools import available_food_search, CompleteOrEscalate
 from langchain_core.tools import tool
 
@@ -158,6 +158,6 @@ You must Call only one two at time! never call a tool twice!!!
 food_search_safe_tools = [available_food_search]
 food_search_sensitive_tools = []
 food_search_tools = food_search_safe_tools + food_search_sensitive_tools
-food_search_runnable = food_search_prompt | llm.bind_tools(
+food_search_runnable = food_search_prompt | llm_for("food_search").bind_tools(
     food_search_tools + [CompleteOrEscalate], tool_choice="any"
 )
\ No newline at end of file
@@ -1,8 +1,8 @@
 from typing import Optional
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from langchain_community.tools.tavily_search import TavilySearchResults
-from config import llm
+from search_providers import web_search_tool
+from config import llm_for
 from tools import available_food_search, CompleteOrEscalate
 from langchain_core.tools import tool
 
@@ -109,11 +109,11 @@ food_suggestion_prompt = ChatPromptTemplate.from_messages(
 
 
 
-food_suggestion_safe_tools = [available_food_search, TavilySearchResults(max_results=3)]
+food_suggestion_safe_tools = [available_food_search, web_search_tool(max_results=3)]
 food_suggestion_sensitive_tools = []
 food_suggestion_tools = food_suggestion_safe_tools + food_suggestion_sensitive_tools
 
-food_suggestion_runnable = food_suggestion_prompt | llm.bind_tools(
+food_suggestion_runnable = food_suggestion_prompt | llm_for("food_suggestion").bind_tools(
     food_suggestion_tools + [CompleteOrEscalate]
 )
 
@@ -1,7 +1,7 @@
 
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from config import llm
+from config import llm_for
 
 class ToGenerate(BaseModel):
     """
@@ -62,4 +62,4 @@ generate_prompt = ChatPromptTemplate.from_messages(
 generate_safe_tools = []
 generate_sensitive_tools = []
 generate_tools = generate_safe_tools + generate_sensitive_tools
-generate_runnable = generate_prompt | llm
\ No newline at end of file
+generate_runnable = generate_prompt | llm_for("generate")
\ No newline at end of file
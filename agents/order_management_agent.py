@@ -1,7 +1,7 @@
 from typing import Literal, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from config import llm
+from config import llm_for
 from tools import cancel_order, comment_order, check_order_status, CompleteOrEscalate
 from langchain_core.tools import tool
 from tools import CompleteOrEscalate
@@ -117,6 +117,6 @@ order_management_prompt = ChatPromptTemplate.from_messages(
 order_management_safe_tools = [check_order_status, comment_order]
 order_management_sensitive_tools = [cancel_order]
 order_management_tools = order_management_safe_tools + order_management_sensitive_tools
-order_management_runnable = order_management_prompt | llm.bind_tools(
+order_management_runnable = order_management_prompt | llm_for("order_management").bind_tools(
     order_management_tools + [CompleteOrEscalate], tool_choice="any"
 )
\ No newline at end of file
@@ -1,7 +1,8 @@
 from typing import Optional, List
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers.openai_tools import PydanticToolsParser
 from pydantic import BaseModel, Field
-from config import llm
+from config import llm_for
 from tools import available_food_search, CompleteOrEscalate
 from langchain_core.tools import tool
 
@@ -141,9 +142,11 @@ food_suggestion_safe_tools = [available_food_search, FoodRecommendation]
 food_suggestion_sensitive_tools = []
 food_suggestion_tools = food_suggestion_safe_tools + food_suggestion_sensitive_tools
 
-food_suggestion_runnable = food_suggestion_prompt | llm.bind_tools(
+food_suggestion_runnable = food_suggestion_prompt | llm_for("draft").bind_tools(
     food_suggestion_tools 
 )
+# Checks the draft's tool arguments, so `Assistant.respond` can re-ask on a malformed call.
+food_suggestion_validator = PydanticToolsParser(tools=[available_food_search.args_schema, FoodRecommendation])
 
 
 class ReviseFoodRecommendation(BaseModel):
@@ -261,6 +264,9 @@ food_revision_safe_tools = [available_food_search, ReviseFoodRecommendation]
 food_revision_sensitive_tools = []
 food_revision_tools = food_revision_safe_tools + food_revision_sensitive_tools
 
-food_revision_runnable = food_revision_prompt | llm.bind_tools(
+food_revision_runnable = food_revision_prompt | llm_for("revise").bind_tools(
     food_revision_tools + [CompleteOrEscalate] 
 )
+food_revision_validator = PydanticToolsParser(
+    tools=[available_food_search.args_schema, ReviseFoodRecommendation, CompleteOrEscalate]
+)
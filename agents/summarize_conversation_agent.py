@@ -1,6 +1,16 @@
 from langchain_core.prompts import ChatPromptTemplate
-from config import llm
-from langchain_core.messages import HumanMessage, RemoveMessage
+from config import (
+    llm_for, TOKEN_BUDGET_SUMMARY_TOKENS, SUMMARY_IN_BACKGROUND, SUMMARY_TRIGGER_TOKENS, SUMMARY_BLOCKING_TOKENS,
+    SUMMARY_KEEP_TOKENS,
+)
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from prompt_cache import history_tokens, message_tokens
+from token_budget import economy_mode
+
+
+# Tool results (retrieved documents, search hits) are clipped in the summarizer's transcript.
+MAX_TOOL_RESULT_CHARS = 500
 
 
 # Summarize Conversation Prompt
@@ -53,43 +63,103 @@ summarize_conversation_safe_tools = []
 summarize_conversation_sensitive_tools = []
 summarize_conversation_tools = summarize_conversation_safe_tools + summarize_conversation_sensitive_tools
 
-summarize_conversation_runnable = summarize_conversation_prompt | llm
-
-
-
-def summarize_conversation(state):
-    
-    # First, we get any existing summary
-    summary = state.get("summary", "")
-
-    # Create our summarization prompt 
+summarize_conversation_runnable = summarize_conversation_prompt | llm_for("summarize_conversation")
+
+
+
+def split_history(messages):
+    """
+    `(fold, keep)`: the messages to fold into the summary and the recent ones to keep verbatim.
+
+    `keep` starts at a user message, so no tool call is separated from its result, and holds
+    the newest turns that fit in SUMMARY_KEEP_TOKENS (always at least the last one).
+    """
+    start, tokens = len(messages), 0
+    for index in range(len(messages) - 1, -1, -1):
+        tokens += message_tokens(messages[index])
+        if isinstance(messages[index], HumanMessage):
+            if tokens > SUMMARY_KEEP_TOKENS and start < len(messages):
+                break
+            start = index
+    if start == len(messages):
+        return [], messages
+    return messages[:start], messages[start:]
+
+
+def _transcript(messages) -> str:
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}")
+        elif isinstance(message, AIMessage):
+            calls = ", ".join(call["name"] for call in message.tool_calls)
+            if message.content:
+                lines.append(f"Assistant: {message.content}")
+            if calls:
+                lines.append(f"Assistant called: {calls}")
+        elif isinstance(message, ToolMessage):
+            content = str(message.content)
+            if len(content) > MAX_TOOL_RESULT_CHARS:
+                content = content[:MAX_TOOL_RESULT_CHARS] + " ..."
+            lines.append(f"Tool {message.name or ''}: {content}")
+    return "\n".join(lines)
+
+
+def _summary_request(messages, summary):
+    # Only the messages since the last summary are sent; the summary stands in for the rest.
     if summary:
-        
-        # A summary already exists
         summary_message = (
             f"This is summary of the conversation to date: {summary}\n\n"
             "Extend the summary by taking into account the new messages above:"
         )
-        
     else:
         summary_message = "Create a summary of the conversation above:"
+    return {"messages": f"{_transcript(messages)}\n\n{summary_message}"}
 
-    # Add prompt to our history
-    messages = state["messages"] + [HumanMessage(content=summary_message)]
-    response = summarize_conversation_runnable.invoke(messages)
 
-    # Delete all but the 2 most recent messages
-    delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
+def _summary_update(fold, response):
+    # Delete the folded messages; the recent turns stay as they are.
+    delete_messages = [RemoveMessage(id=m.id) for m in fold]
     return {"summary": response.content, "messages": delete_messages}
 
 
-def should_summarize(state):
+def summarize_conversation(state):
+    fold, _ = split_history(state["messages"])
+    if not fold:
+        return {}
+    response = summarize_conversation_runnable.invoke(_summary_request(fold, state.get("summary", "")))
+    return _summary_update(fold, response)
+
+
+async def asummarize_conversation(state):
+    fold, _ = split_history(state["messages"])
+    if not fold:
+        return {}
+    response = await summarize_conversation_runnable.ainvoke(_summary_request(fold, state.get("summary", "")))
+    return _summary_update(fold, response)
+
+
+def needs_summary(state, config: RunnableConfig = None) -> bool:
+    """Whether the history holds enough tokens to fold into the rolling summary."""
+    # Near the token budget, fold the history into the summary much earlier.
+    limit = TOKEN_BUDGET_SUMMARY_TOKENS if economy_mode(config) else SUMMARY_TRIGGER_TOKENS
+    messages = state["messages"]
+    return history_tokens(messages) > limit and bool(split_history(messages)[0])
+
+
+def should_summarize(state, config: RunnableConfig = None):
     
     """Return the next node to execute."""
     
-    messages = state["messages"]
-    if len(messages) > 18:
+    if SUMMARY_IN_BACKGROUND:
+        # The summary is kept up to date after each turn (see background_summary.py); the
+        # turn itself only waits for one when the history is about to overflow.
+        messages = state["messages"]
+        summarize = history_tokens(messages) > SUMMARY_BLOCKING_TOKENS and bool(split_history(messages)[0])
+    else:
+        summarize = needs_summary(state, config)
+    if summarize:
         return "summarize_conversation"
     
     # Otherwise we can just end
-    return "primary_assistant"
\ No newline at end of file
+    return "primary_assistant"
@@ -1,8 +1,8 @@
 
 from langchain_core.prompts import ChatPromptTemplate
-from config import llm
+from config import llm_for
 from agents.filter_agent import ToFilter
-from langchain_community.tools.tavily_search import TavilySearchResults
+from search_providers import web_search_tool
 
 
 
@@ -50,9 +50,9 @@ web_search_prompt = ChatPromptTemplate.from_messages(
 
 
 
-web_search_safe_tools = [TavilySearchResults(max_results=3)]
+web_search_safe_tools = [web_search_tool(max_results=3)]
 web_search_sensitive_tools = []
 web_search_tools = web_search_safe_tools + web_search_sensitive_tools
-web_search_runnable = web_search_prompt | llm.bind_tools(
+web_search_runnable = web_search_prompt | llm_for("web_search").bind_tools(
     web_search_tools + [ToFilter], tool_choice="any"
 )
\ No newline at end of file
@@ -1,13 +1,65 @@
 
-from langchain_core.messages import HumanMessage
+import asyncio
+from contextlib import nullcontext
+from langchain_core.messages import HumanMessage, ToolMessage
 from graphs.supergraph import supergraph
+from config import PROMPT_PREFIX_CHECK, WARMUP_ON_STARTUP, SUMMARY_IN_BACKGROUND
+from prompt_cache import PrefixStabilityTracker
+import warmup
 import chainlit as cl
+from chainlit.server import app as server_app
+from fastapi.responses import JSONResponse, PlainTextResponse
+from tracing import tracer
+from token_budget import ledger
+import retry_policy
+import search_providers
+from background_summary import BackgroundSummarizer
 import uuid
+
+prefix_tracker = PrefixStabilityTracker(verbose=True) if PROMPT_PREFIX_CHECK else None
+summarizer = BackgroundSummarizer(supergraph) if SUMMARY_IN_BACKGROUND else None
+
+
+@server_app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the worker is warm (or warm-up is off), 503 before; per-step timings in the body."""
+    report = warmup.status()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@server_app.get("/metrics")
+async def metrics():
+    """Per-node latency, token, retry, budget and web search cache aggregates in Prometheus format."""
+    exporters = (tracer, ledger, retry_policy, search_providers.cache)
+    body = "".join(exporter.prometheus() for exporter in exporters if exporter)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+# Chainlit registers the catch-all route serving its frontend when it is imported, before
+# this module; move it back to the end so the routes above are reachable.
+for route in [route for route in server_app.router.routes if getattr(route, "path", None) == "/{full_path:path}"]:
+    server_app.router.routes.remove(route)
+    server_app.router.routes.append(route)
+
+if WARMUP_ON_STARTUP:
+    if hasattr(cl, "on_app_startup"):
+        _warmup_tasks = []
+
+        @cl.on_app_startup
+        async def warm_up():
+            # Not awaited: the server accepts connections while /ready reports progress.
+            _warmup_tasks.append(asyncio.create_task(warmup.arun()))
+    else:
+        # Chainlit releases without a startup hook import this module at server start.
+        warmup.start()
+
+
 def get_label(node_name:str):
     return {"primary_assistant":"Primary Assistant",
     "food_suggestion":"Food Suggester",
     "food_search":"Food Search",
     "doc_retrieval":"Doc Retrieval",
+    "fast_answer":"Doc Retrieval",
     # "enter_content_grader":"Content Grader",
     "enter_web_search":"Web Search",
     "web_search":"Web Search",
@@ -22,94 +74,90 @@ def get_label(node_name:str):
 async def on_chat_start():
     cl.user_session.set("thread_id", str(uuid.uuid4()))
 
-import asyncio
-
 @cl.on_message
 async def on_message(msg: cl.Message):
-    try:
-        cb = cl.LangchainCallbackHandler()
-        final_answer = cl.Message(content="")
-        config = {
-            "configurable": {
-                "user_info": "Ali Akbar",
-                "thread_id": cl.user_session.get("thread_id"),
-                
-            }, "recursion_limit": 100
-        }
-
-        async with cl.Step(name="Primary Assistant", type="llm") as step:
-            step.input = msg.content
-            step.output = ""
-
-            tasks = []  # Track all running async tasks
-
-            async def async_stream(resume:bool):
-                for streamed_msg, metadata in supergraph.stream(
-                    None if resume else {"messages": [HumanMessage(content=msg.content)]},
-                    stream_mode="messages",
-                    config=config
-                ):
-                    yield streamed_msg, metadata  # Convert to async generator
-
-
-            async def process_stream(resume:bool=False):
-                async for streamed_msg, metadata in async_stream(resume):
-                    if(get_label(metadata["langgraph_node"])):
-                        step.name = get_label(metadata["langgraph_node"])
-                        await step.update()
-                    if (
-                        streamed_msg.content
-                        and not isinstance(streamed_msg, HumanMessage)
-                        and metadata["langgraph_node"] in ["primary_assistant", "generate", "food_suggestion", "food_search"]
+    cb = cl.LangchainCallbackHandler()
+    final_answer = cl.Message(content="")
+    config = {
+        "configurable": {
+            "user_info": "Ali Akbar",
+            "thread_id": cl.user_session.get("thread_id"),
+            
+        }, "recursion_limit": 100
+    }
+    config["callbacks"] = [handler for handler in (prefix_tracker, tracer) if handler]
+    # The turn ends even if it is cancelled (the user pressed stop); once the answer is out,
+    # the history is folded into the summary for the next turn.
+    async with summarizer.turn(config) if summarizer else nullcontext():
+        try:
+            async with cl.Step(name="Primary Assistant", type="llm") as step:
+                step.input = msg.content
+                step.output = ""
+
+                tasks = []  # Track all running async tasks
+
+                async def process_stream(resume:bool=False):
+                    async for streamed_msg, metadata in supergraph.astream(
+                        None if resume else {"messages": [HumanMessage(content=msg.content)]},
+                        stream_mode="messages",
+                        config=config
                     ):
-                        await final_answer.stream_token(streamed_msg.content)
-                    else:
                         if(get_label(metadata["langgraph_node"])):
                             step.name = get_label(metadata["langgraph_node"])
                             await step.update()
+                        if (
+                            streamed_msg.content
+                            and not isinstance(streamed_msg, (HumanMessage, ToolMessage))
+                            and metadata["langgraph_node"] in ["primary_assistant", "generate", "fast_answer", "food_suggestion", "food_search"]
+                        ):
+                            await final_answer.stream_token(streamed_msg.content)
+                        else:
+                            if(get_label(metadata["langgraph_node"])):
+                                step.name = get_label(metadata["langgraph_node"])
+                                await step.update()
 
-            # Start the async task and track it
-            stream_task = asyncio.create_task(process_stream())
-            tasks.append(stream_task)
+                # Start the async task and track it
+                stream_task = asyncio.create_task(process_stream())
+                tasks.append(stream_task)
             
-            try:
-                await asyncio.gather(*tasks)  # Wait for all tasks to complete
-            except asyncio.CancelledError:
-                print("Cancelling all tasks...")
-                for task in tasks:
-                    task.cancel()  # Cancel each task
-                await asyncio.gather(*tasks, return_exceptions=True)  # Ensure all are properly cancelled
-        state = supergraph.get_state(config=config)
+                try:
+                    await asyncio.gather(*tasks)  # Wait for all tasks to complete
+                except asyncio.CancelledError:
+                    print("Cancelling all tasks...")
+                    for task in tasks:
+                        task.cancel()  # Cancel each task
+                    await asyncio.gather(*tasks, return_exceptions=True)  # Ensure all are properly cancelled
+            state = await supergraph.aget_state(config=config)
 
         
-        if state.next:
-            res = await cl.AskActionMessage(
-            content="Are you sure?!",
-            actions=[
-                cl.Action(name="continue", payload={"value": "continue"}, label="✅ YES"),
-                cl.Action(name="cancel", payload={"value": "cancel"}, label="❌ Cancel"),
-            ],
-        ).send()
-            if res and res.get("payload").get("value") == "continue":
-                pass
-                # await cl.Message(
-                #     content="Continue!",
-                # ).send()
-            else:
-                supergraph.update_state(
-                    config,
-                    {"messages": [HumanMessage(
-                            content=f"i changed my mind.",
-                        )], "next":"leave_skill"},
-                )
-            stream_task = asyncio.create_task(process_stream(resume=True))
-            tasks.append(stream_task)
-            await asyncio.gather(*tasks)
-    except Exception as e:
-        print(e)
-        print("*"*100)
-        state = supergraph.get_state(config=config)
-        print(state)
-        await final_answer.stream_token("I'm sorry, but I couldn't process your request at this time. Could you try rephrasing or providing it in a different format?")
-
-    await final_answer.send()  # Send the final response after streaming completes
+            if state.next:
+                res = await cl.AskActionMessage(
+                content="Are you sure?!",
+                actions=[
+                    cl.Action(name="continue", payload={"value": "continue"}, label="✅ YES"),
+                    cl.Action(name="cancel", payload={"value": "cancel"}, label="❌ Cancel"),
+                ],
+            ).send()
+                if res and res.get("payload").get("value") == "continue":
+                    pass
+                    # await cl.Message(
+                    #     content="Continue!",
+                    # ).send()
+                else:
+                    await supergraph.aupdate_state(
+                        config,
+                        {"messages": [HumanMessage(
+                                content=f"i changed my mind.",
+                            )], "next":"leave_skill"},
+                    )
+                stream_task = asyncio.create_task(process_stream(resume=True))
+                tasks.append(stream_task)
+                await asyncio.gather(*tasks)
+        except Exception as e:
+            print(e)
+            print("*"*100)
+            state = await supergraph.aget_state(config=config)
+            print(state)
+            await final_answer.stream_token("I'm sorry, but I couldn't process your request at this time. Could you try rephrasing or providing it in a different format?")
+
+        await final_answer.send()  # Send the final response after streaming completes
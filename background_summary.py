@@ -0,0 +1,103 @@
+import asyncio
+from contextlib import asynccontextmanager
+from langchain_core.messages import RemoveMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from agents.summarize_conversation_agent import asummarize_conversation, needs_summary
+from tracing import tracer
+
+
+class BackgroundSummarizer:
+    """
+    Keeps each thread's rolling summary up to date off the user's critical path.
+
+    Wrap every turn in `turn(config)` (or `start_turn`/`end_turn`). When a turn ends and the
+    history is long enough, the summary is computed in a background task and written to the
+    thread's checkpoint as the `as_node` node, so the next turn starts from it without
+    waiting. Its LLM call is traced as "background_summary" and charged to the thread's
+    token budget. A summary that finishes while a new turn is running is held back and
+    written when that turn ends, since the two writes would otherwise race on the checkpoint.
+    """
+
+    def __init__(self, graph, as_node: str = "commit_summary"):
+        self.graph = graph
+        self.as_node = as_node
+        self._active = set()   # thread ids with a turn in progress
+        self._tasks = {}       # thread id -> running summary task
+        self._pending = {}     # thread id -> (summary it extends, update) waiting for the turn to end
+        self.stats = {"scheduled": 0, "committed": 0, "deferred": 0, "discarded": 0, "failed": 0}
+
+    @staticmethod
+    def _thread_id(config: RunnableConfig):
+        return config["configurable"]["thread_id"]
+
+    def start_turn(self, config: RunnableConfig):
+        self._active.add(self._thread_id(config))
+
+    async def end_turn(self, config: RunnableConfig):
+        """Write a summary held back during the turn, then start the next one if needed."""
+        thread_id = self._thread_id(config)
+        self._active.discard(thread_id)
+        try:
+            if thread_id in self._pending:
+                await self._commit(config, *self._pending.pop(thread_id))
+            await self.schedule(config)
+        except Exception as e:
+            print(e)
+
+    @asynccontextmanager
+    async def turn(self, config: RunnableConfig):
+        self.start_turn(config)
+        try:
+            yield
+        finally:
+            await self.end_turn(config)
+
+    async def schedule(self, config: RunnableConfig):
+        """Start a summary for the thread if it needs one and none is running."""
+        thread_id = self._thread_id(config)
+        if thread_id in self._tasks:
+            return
+        snapshot = await self.graph.aget_state(config)
+        # A thread waiting on an interrupt (order approval) is resumed from that checkpoint.
+        if snapshot.next or not snapshot.values.get("messages") or not needs_summary(snapshot.values, config):
+            return
+        self.stats["scheduled"] += 1
+        task = asyncio.create_task(self._summarize(config, snapshot.values))
+        self._tasks[thread_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(thread_id, None))
+
+    async def _summarize(self, config: RunnableConfig, values: dict):
+        thread_id = self._thread_id(config)
+        base = values.get("summary")
+        try:
+            run_config = tracer.detached_config("background_summary", thread_id) if tracer else {}
+            update = await RunnableLambda(asummarize_conversation).ainvoke(values, run_config)
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(e)
+            return
+        if not update:
+            return
+        if thread_id in self._active:
+            self.stats["deferred"] += 1
+            self._pending[thread_id] = (base, update)
+        else:
+            await self._commit(config, base, update)
+
+    async def _commit(self, config: RunnableConfig, base, update: dict):
+        snapshot = await self.graph.aget_state(config)
+        if snapshot.next or snapshot.values.get("summary") != base:
+            # The turn summarized (blocking) or stopped at an interrupt meanwhile.
+            self.stats["discarded"] += 1
+            return
+        present = {message.id for message in snapshot.values.get("messages", [])}
+        removals = [message for message in update["messages"] if isinstance(message, RemoveMessage) and message.id in present]
+        await self.graph.aupdate_state(
+            config, {"summary": update["summary"], "messages": removals}, as_node=self.as_node
+        )
+        self.stats["committed"] += 1
+
+    async def wait(self):
+        """Wait for the summaries in flight (used on shutdown and in tests)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
@@ -0,0 +1,284 @@
+"""
+Catalog search scaling benchmark on synthetic menus.
+
+    python -m benchmarks.catalog_search --sizes 10000 100000 1000000 --queries 300 --json catalog_bench.json
+
+For each size a synthetic `foods` table is generated with the production schema, seeded from the
+real dish, category and restaurant names in food_orders.db. Restaurants carry ~25 dishes each, and
+dishes are combinations of modifiers and real dish names, so value counts grow like a real
+marketplace. Databases are cached in --workdir per (size, seed).
+
+Queries are sampled from the generated values with realistic noise: exact names in random case,
+base dish names ("pizza" for "Spicy Pizza"), one- and two-edit typos (keyboard-neighbour
+substitutions, deletions, insertions, transpositions) and names absent from the catalog.
+
+Each size runs in a fresh process. Reported per size: index build time, traced peak memory of the
+build and peak RSS. Reported per query mode (food, restaurant, combined): p50/p95/p99 latency,
+throughput and mean result count. Every query is distinct, so the result cache never answers.
+Build time and queries are timed with tracemalloc off (it slows them several times over); the
+traced peak comes from a second, untimed build afterwards.
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, "food_orders.db")
+ITEMS_PER_RESTAURANT = 25
+MODES = ("food", "restaurant", "combined")
+
+MODIFIERS = [
+    "Spicy", "Classic", "Grilled", "Smoked", "Vegan", "Double", "Crispy", "Honey", "Garlic", "Truffle",
+    "Mini", "Family", "Royal", "House", "Lemon", "BBQ", "Cheesy", "Stuffed", "Baked", "Sweet",
+    "Herb", "Chili", "Creamy", "Loaded", "Rustic", "Golden", "Fresh", "Deluxe", "Tandoori", "Teriyaki",
+]
+RESTAURANT_WORDS = [
+    "Golden", "Urban", "Rustic", "Royal", "Little", "Happy", "Blue", "Green", "Red", "Silver",
+    "Corner", "Street", "Garden", "Harbor", "Sunny", "Old", "Grand", "Lucky", "Spice", "Olive",
+    "Kitchen", "Grill", "Bistro", "Diner", "House", "Table", "Eatery", "Cafe", "Canteen", "Oven",
+    "Pantry", "Spoon", "Fork", "Plate", "Bowl", "Hub", "Corner", "Yard", "Tavern", "Shack",
+]
+BRANCHES = ["", "Downtown", "Westside", "Eastside", "Uptown", "Midtown", "Central", "Harbor", "Park", "Station"]
+KEYBOARD = [
+    "qwertyuiop", "asdfghjkl", "zxcvbnm",
+]
+
+
+def _neighbours() -> dict:
+    neighbours = {}
+    for r, row in enumerate(KEYBOARD):
+        for c, ch in enumerate(row):
+            near = set()
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    rr, cc = r + dr, c + dc
+                    if (dr or dc) and 0 <= rr < len(KEYBOARD) and 0 <= cc < len(KEYBOARD[rr]):
+                        near.add(KEYBOARD[rr][cc])
+            neighbours[ch] = sorted(near)
+    return neighbours
+
+
+NEIGHBOURS = _neighbours()
+
+
+def _seed_values():
+    connection = sqlite3.connect(SOURCE_DB)
+    dishes = connection.execute("SELECT DISTINCT food_name, food_category FROM foods").fetchall()
+    restaurants = [row[0] for row in connection.execute("SELECT DISTINCT restaurant_name FROM foods")]
+    connection.close()
+    return dishes, restaurants
+
+
+def _restaurant_names(count: int, seed_restaurants: list[str], rng: random.Random) -> list[str]:
+    names, seen = [], set()
+    candidates = list(seed_restaurants)
+    while len(names) < count:
+        if candidates:
+            name = candidates.pop()
+        else:
+            name = f"{rng.choice(RESTAURANT_WORDS)} {rng.choice(RESTAURANT_WORDS)}"
+            branch = rng.choice(BRANCHES)
+            if branch:
+                name = f"{name} {branch}"
+            if name in seen:
+                name = f"{name} {rng.randint(2, 999)}"
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def _dishes(count: int, seed_dishes: list[tuple], rng: random.Random) -> list[tuple]:
+    dishes, seen = list(seed_dishes), {name for name, _ in seed_dishes}
+    attempts = 0
+    while len(dishes) < count and attempts < count * 20:
+        attempts += 1
+        base, category = rng.choice(seed_dishes)
+        modifiers = rng.sample(MODIFIERS, rng.choice((1, 1, 2)))
+        name = " ".join(modifiers + [base])
+        if name not in seen:
+            seen.add(name)
+            dishes.append((name, category))
+    return dishes
+
+
+def generate_catalog(path: str, size: int, seed: int):
+    """Write a `foods` table of `size` rows to `path`, mirroring food_orders.db's schema."""
+    rng = random.Random(seed)
+    seed_dishes, seed_restaurants = _seed_values()
+    restaurants = _restaurant_names(max(1, size // ITEMS_PER_RESTAURANT), seed_restaurants, rng)
+    dishes = _dishes(max(len(seed_dishes), size // 5), seed_dishes, rng)
+    # Zipf-like popularity: a few dishes (pizza, burger...) appear on many menus.
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(dishes))]
+    rng.shuffle(weights)
+
+    picks = rng.choices(dishes, weights, k=size)
+    rows = []
+    for index, (name, category) in enumerate(picks):
+        if not index % 7:
+            name, category = rng.choice(dishes)  # long tail of one-off specials
+        rows.append((name, category, restaurants[index % len(restaurants)], round(rng.uniform(2, 40), 2)))
+
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        DROP TABLE IF EXISTS foods;
+        CREATE TABLE foods (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            food_name TEXT NOT NULL,
+            food_category TEXT NOT NULL,
+            restaurant_name TEXT NOT NULL,
+            price REAL NOT NULL
+        );
+    """)
+    connection.executemany(
+        "INSERT INTO foods (food_name, food_category, restaurant_name, price) VALUES (?, ?, ?, ?)", rows)
+    connection.commit()
+    connection.close()
+
+
+def typo(text: str, rng: random.Random) -> str:
+    if len(text) < 2:
+        return text
+    i = rng.randrange(len(text))
+    kind = rng.choices(("substitute", "delete", "insert", "transpose"), (55, 20, 15, 10))[0]
+    ch = text[i].lower()
+    if kind == "substitute" and ch in NEIGHBOURS:
+        return text[:i] + rng.choice(NEIGHBOURS[ch]) + text[i + 1:]
+    if kind == "insert":
+        return text[:i] + rng.choice(NEIGHBOURS.get(ch) or ["e"]) + text[i:]
+    if kind == "transpose" and i < len(text) - 1:
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    return text[:i] + text[i + 1:]
+
+
+def noisy(text: str, rng: random.Random) -> str:
+    """Exact (50%), one typo (30%), two typos (12%) or a name absent from the catalog (8%)."""
+    roll = rng.random()
+    if roll < 0.50:
+        return rng.choice((text, text.lower(), text.upper(), text.title()))
+    if roll < 0.80:
+        return typo(text, rng)
+    if roll < 0.92:
+        return typo(typo(text, rng), rng)
+    return "".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(rng.randint(5, 12)))
+
+
+def make_queries(rows: list[tuple], count: int, seed: int) -> dict:
+    rng = random.Random(seed + 1)
+    queries = {mode: [] for mode in MODES}
+    seen = {mode: set() for mode in MODES}
+    attempts = 0
+    while min(len(q) for q in queries.values()) < count and attempts < count * 50:
+        attempts += 1
+        _, food_name, _, restaurant_name, _ = rng.choice(rows)
+        if rng.random() < 0.4:
+            food_name = food_name.split()[-1]  # users often type the base dish only
+        candidates = {
+            "food": (noisy(food_name, rng), None),
+            "restaurant": (None, noisy(restaurant_name, rng)),
+            "combined": (noisy(food_name, rng), noisy(restaurant_name, rng)),
+        }
+        for mode, query in candidates.items():
+            key = tuple(part.lower() if part else None for part in query)
+            if len(queries[mode]) < count and key not in seen[mode]:
+                seen[mode].add(key)
+                queries[mode].append(query)
+    return queries
+
+
+def _percentiles(latencies: list[float]) -> dict:
+    return {f"p{q}_ms": float(np.percentile(latencies, q)) for q in (50, 95, 99)}
+
+
+def run_size(path: str, size: int, query_count: int, seed: int) -> dict:
+    """Build the index over `path` and time every query mode (runs in its own process)."""
+    import database
+    from catalog_index import get_catalog_index, reset_catalog_index
+
+    database.configure(path)
+    reset_catalog_index()
+    start = time.perf_counter()
+    index = get_catalog_index()
+    build_seconds = time.perf_counter() - start
+    queries = make_queries(index.rows, query_count, seed)
+
+    report = {
+        "rows": len(index.rows),
+        "distinct_foods": len(index.food_names),
+        "distinct_restaurants": len(index.restaurant_names),
+        "build_seconds": build_seconds,
+        "modes": {},
+    }
+    for mode in MODES:
+        latencies, matches = [], 0
+        started = time.perf_counter()
+        for food_name, restaurant_name in queries[mode]:
+            query_start = time.perf_counter()
+            matches += len(index.search(food_name, restaurant_name))
+            latencies.append((time.perf_counter() - query_start) * 1000)
+        elapsed = time.perf_counter() - started
+        report["modes"][mode] = {
+            "queries": len(latencies),
+            **_percentiles(latencies),
+            "throughput_qps": len(latencies) / elapsed if elapsed else 0.0,
+            "mean_matches": matches / len(latencies) if latencies else 0.0,
+        }
+    report["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    # Memory of the build alone, measured in a separate pass so tracing never skews the timings.
+    del index
+    reset_catalog_index()
+    gc.collect()
+    tracemalloc.start()
+    get_catalog_index()
+    report["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=300, help="distinct queries per mode")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--workdir", default=tempfile.gettempdir(), help="where generated catalogs are cached")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        path = os.path.join(args.workdir, f"catalog_bench_{size}_{args.seed}.db")
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            generate_catalog(path, size, args.seed)
+            print(f"generated {size} rows in {time.perf_counter() - start:.1f}s -> {path}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            report = pool.submit(run_size, path, size, args.queries, args.seed).result()
+        results[str(size)] = report
+
+        print(f"\n{size} rows: {report['distinct_foods']} foods, {report['distinct_restaurants']} restaurants, "
+              f"build {report['build_seconds']:.2f}s, peak traced {report['peak_traced_mb']:.1f} MB, "
+              f"peak RSS {report['peak_rss_mb']:.1f} MB")
+        print(f"{'mode':>12} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'qps':>10} {'matches':>10}")
+        for mode, stats in report["modes"].items():
+            print(f"{mode:>12} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['p99_ms']:>10.3f} "
+                  f"{stats['throughput_qps']:>10.1f} {stats['mean_matches']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"seed": args.seed, "queries_per_mode": args.queries, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
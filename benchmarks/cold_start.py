@@ -0,0 +1,218 @@
+"""
+Measure how long the app takes to become servable from a cold process.
+
+    python -m benchmarks.cold_start --json cold_start.json
+
+Every measurement runs in a fresh interpreter:
+
+- imports: `python -X importtime -c "import <module>"` per target, reporting its cumulative
+  import time and the heaviest modules it pulled in (or the error if it cannot be imported).
+- compile: `StateGraph.compile` timed per graph module while importing graphs.supergraph
+  and each part_N_graph.
+- first_token: import the supergraph with a stubbed, streaming LLM and time the first token of
+  a reply, so the number reflects loading and graph overhead rather than the provider.
+
+The JSON output has stable keys so files from two commits can be diffed directly.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TARGETS = [
+    "config",
+    "database",
+    "tools",
+    "utilities",
+    "langchain_community.tools.tavily_search",
+    "lancedb",
+    "sentence_transformers",
+    "llama_index.core",
+    "parse",
+    "graphs.supergraph",
+    "app",
+]
+GRAPH_MODULES = [
+    "graphs.part_1_graph",
+    "graphs.part_2_graph",
+    "graphs.part_3_graph",
+    "graphs.part_4_graph",
+    "graphs.part_5_graph",
+    "graphs.supergraph",
+]
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+COMPILE_SCRIPT = """
+import json, sys, time, importlib
+from langgraph.graph import StateGraph
+timings = {}
+compile = StateGraph.compile
+def timed(self, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return compile(self, *args, **kwargs)
+    finally:
+        name = sys._getframe(1).f_globals.get("__name__")
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+StateGraph.compile = timed
+for module in sys.argv[1:]:
+    try:
+        importlib.import_module(module)
+    except Exception as e:
+        timings.setdefault("errors", {})[module] = repr(e)
+print(json.dumps(timings))
+"""
+
+FIRST_TOKEN_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+import config
+
+class StubLLM(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+def replies():
+    while True:
+        yield AIMessage(content="Hello! What would you like to eat today?")
+
+config.llm = StubLLM(messages=replies())
+from graphs.supergraph import supergraph
+imported = time.perf_counter()
+
+async def main():
+    first = None
+    stream = supergraph.astream(
+        {"messages": [HumanMessage(content="hello")]},
+        {"configurable": {"thread_id": "cold-start"}},
+        stream_mode="messages",
+    )
+    async for message, metadata in stream:
+        if first is None and isinstance(message, AIMessageChunk) and message.content:
+            first = time.perf_counter()
+    return first
+
+first = asyncio.run(main())
+done = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "first_token_seconds": (first - start) if first else None,
+    "first_token_after_import_seconds": (first - imported) if first else None,
+    "total_seconds": done - start,
+}))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # Constructing the clients needs keys; nothing here calls the real services.
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    env.setdefault("TAVILY_API_KEY", "benchmark")
+    env.setdefault("WARMUP_ON_STARTUP", "false")
+    return env
+
+
+def _run(args: list[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=_env(), capture_output=True, text=True)
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """`(module, self us, cumulative us, depth)` for every line of `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2)), depth))
+    return rows
+
+
+def measure_import(target: str, top: int) -> dict:
+    result = _run(["-X", "importtime", "-c", f"import {target}"])
+    rows = parse_importtime(result.stderr)
+    report = {"seconds": None, "modules": len(rows), "heaviest": []}
+    if result.returncode != 0:
+        report["error"] = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"
+    own = [row for row in rows if row[0] == target]
+    if own:
+        report["seconds"] = own[-1][2] / 1e6
+    # Heaviest top-level packages by cumulative time (depth 0 lines are direct imports).
+    packages = {}
+    for module, _, cumulative, depth in rows:
+        root = module.split(".")[0]
+        if depth <= 1:
+            packages[root] = max(packages.get(root, 0), cumulative)
+    report["heaviest"] = [
+        [name, round(us / 1e6, 4)] for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+    ]
+    return report
+
+
+def measure_compile(modules: list[str]) -> dict:
+    result = _run(["-c", COMPILE_SCRIPT, *modules])
+    if result.returncode != 0 or not result.stdout.strip():
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_first_token() -> dict:
+    result = _run(["-c", FIRST_TOKEN_SCRIPT])
+    if result.returncode != 0 or not result.stdout.strip():
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=DEFAULT_TARGETS, help="modules to time cold imports of")
+    parser.add_argument("--top", type=int, default=10, help="heaviest packages to list per target")
+    parser.add_argument("--repeats", type=int, default=1, help="runs per measurement; the minimum is kept")
+    parser.add_argument("--json", default="cold_start.json", help="output file")
+    args = parser.parse_args()
+
+    imports = {}
+    for target in args.targets:
+        runs = [measure_import(target, args.top) for _ in range(args.repeats)]
+        timed = [run for run in runs if run["seconds"] is not None]
+        imports[target] = min(timed, key=lambda run: run["seconds"]) if timed else runs[-1]
+        seconds = imports[target]["seconds"]
+        print(f"import {target:<45} {'error' if seconds is None else f'{seconds:8.3f}s'}")
+
+    compile_times = {
+        module: measure_compile([module]).get(module) for module in GRAPH_MODULES
+    }
+    for module, seconds in compile_times.items():
+        print(f"compile {module:<44} {'-' if seconds is None else f'{seconds:8.3f}s'}")
+
+    first_token = min(
+        (measure_first_token() for _ in range(args.repeats)),
+        key=lambda run: run.get("first_token_seconds") or float("inf"),
+    )
+    print(f"first token (stubbed LLM)                          {first_token}")
+
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "imports": imports,
+        "compile": compile_times,
+        "first_token": first_token,
+    }
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Compare embedding backends for query encoding on the food corpus.
+
+    python -m benchmarks.embeddings --backends torch onnx onnx-int8 --k 10 --json embeddings_bench.json
+
+Each backend runs in a fresh process so its peak RSS is not mixed with the others'. Reported per
+backend: model load time, single-query encode latency (p50/p95/mean), corpus encode time, peak
+RSS, and retrieval agreement with the first backend (the baseline):
+
+- query_overlap@k: top-k chunks by the stored table vectors when only the query is encoded with
+  this backend (the query-time swap, no re-ingest).
+- reindexed_overlap@k: top-k when both the corpus and the query are encoded with this backend
+  (what a parse.py re-ingest with the backend would give).
+- query_cosine: mean cosine between this backend's and the baseline's query vectors.
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import lancedb
+from embeddings import BACKENDS
+
+
+LANCE_DB_PATH = "./lancedb"
+TABLE_NAME = "food"
+DEFAULT_QUERIES = [
+    "health benefits of olive oil",
+    "drinking tea after a meal",
+    "how to store fresh fish",
+    "calories in avocado",
+    "vitamins in spinach",
+    "brown rice versus white rice",
+    "how long to boil an egg",
+    "foods high in protein",
+    "effects of eating rice at night",
+    "cooking pasta techniques",
+    "is coffee bad for digestion",
+    "sources of dietary fiber",
+    "how to keep bread fresh",
+    "nutritional value of lentils",
+    "benefits of eating yogurt",
+    "how much sugar is too much",
+    "storing vegetables in the fridge",
+    "omega-3 fatty acids in salmon",
+    "difference between baking soda and baking powder",
+    "is red meat healthy",
+]
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentile(values, q) -> float:
+    return float(np.percentile(values, q))
+
+
+def _measure(backend: str, model_name: str, corpus: list[str], queries: list[str], repeats: int) -> dict:
+    from embeddings import Embedder
+
+    start = time.perf_counter()
+    embedder = Embedder(model_name, backend)
+    load_seconds = time.perf_counter() - start
+    embedder.embed(["warm up"])
+
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            embedder.embed([query])
+            latencies.append((time.perf_counter() - start) * 1000)
+    query_vectors = embedder.embed(queries)
+
+    start = time.perf_counter()
+    doc_vectors = embedder.embed(corpus)
+    corpus_seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "query_ms_p50": _percentile(latencies, 50),
+        "query_ms_p95": _percentile(latencies, 95),
+        "query_ms_mean": float(np.mean(latencies)),
+        "corpus_seconds": corpus_seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "query_vectors": query_vectors,
+        "doc_vectors": doc_vectors,
+    }
+
+
+def _top_k(query_vectors: np.ndarray, doc_vectors: np.ndarray, k: int) -> list[set]:
+    scores = query_vectors @ doc_vectors.T
+    return [set(np.argsort(-row)[:k]) for row in scores]
+
+
+def _overlap(a: list[set], b: list[set], k: int) -> float:
+    return float(np.mean([len(x & y) / k for x, y in zip(a, b)]))
+
+
+def load_corpus():
+    table = lancedb.connect(LANCE_DB_PATH).open_table(TABLE_NAME)
+    data = table.to_arrow()
+    model_name = table.embedding_functions["vector"].function.name
+    stored = np.asarray(data["vector"].to_pylist(), dtype=np.float32)
+    return model_name, data["text"].to_pylist(), stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--queries", help="file with one query per line (default: built-in food questions)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    model_name, corpus, stored = load_corpus()
+    k = min(args.k, len(corpus))
+
+    results = []
+    for backend in args.backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results.append(pool.submit(_measure, backend, model_name, corpus, queries, args.repeats).result())
+
+    baseline = results[0]
+    production = _top_k(baseline["query_vectors"], stored, k)
+    report = []
+    for result in results:
+        query_vectors, doc_vectors = result.pop("query_vectors"), result.pop("doc_vectors")
+        result[f"query_overlap@{k}"] = _overlap(_top_k(query_vectors, stored, k), production, k)
+        result[f"reindexed_overlap@{k}"] = _overlap(_top_k(query_vectors, doc_vectors, k), production, k)
+        result["query_cosine"] = float(np.mean(np.sum(query_vectors * baseline["query_vectors"], axis=1)))
+        report.append(result)
+
+    print(f"model={model_name} corpus={len(corpus)} chunks queries={len(queries)} baseline={baseline['backend']}")
+    columns = ["backend", "load_seconds", "query_ms_p50", "query_ms_p95", "corpus_seconds", "peak_rss_mb",
+               f"query_overlap@{k}", f"reindexed_overlap@{k}", "query_cosine"]
+    print("  ".join(f"{c:>20}" for c in columns))
+    for result in report:
+        print("  ".join(f"{result[c]:>20}" if isinstance(result[c], str) else f"{result[c]:>20.3f}" for c in columns))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": model_name, "corpus_size": len(corpus), "queries": len(queries), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+import database
+
+
+MAX_DISTANCE = 1
+RESULT_CACHE_SIZE = 1024
+# Every write to `foods`, from any connection or process, bumps catalog_version.version, so
+# the shared index can tell it is stale with a one-row read.
+VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalog_version (id, version) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS foods_insert_version AFTER INSERT ON foods
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS foods_update_version AFTER UPDATE ON foods
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS foods_delete_version AFTER DELETE ON foods
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+"""
+
+
+def normalize(value):
+    """Lower-case a search term, mapping empty values to None."""
+    if not value:
+        return None
+    return value.lower()
+
+
+def char_mask(text: str) -> int:
+    """Bitmask of the distinct characters in `text` (bucketed into 64 bits)."""
+    mask = 0
+    for ch in set(text):
+        mask |= 1 << (ord(ch) % 64)
+    return mask
+
+
+def bounded_distance(query: str, candidate: str, max_distance: int = MAX_DISTANCE):
+    """
+    The distance `available_food_search` has always used, bounded by `max_distance`.
+
+    The old code took the minimum of three weighted Levenshtein distances,
+    `(0, 1, 1)`, `(1, 0, 1)` and `(1, 1, 1)`. That minimum is the number of characters
+    that must be dropped from the shorter string for it to become a subsequence of the
+    longer one, so all three weightings are covered by a single greedy pass that tracks
+    the earliest match position for each number of dropped characters.
+
+    Returns the distance, or None as soon as it is known to exceed `max_distance`.
+    """
+    if len(query) <= len(candidate):
+        short, long = query, candidate
+    else:
+        short, long = candidate, query
+    if len(short) <= max_distance:
+        max_distance = len(short)
+
+    missing = len(long) + 1
+    # positions[k]: earliest end position in `long` after matching the prefix of
+    # `short` seen so far with exactly k characters dropped.
+    positions = [0] + [missing] * max_distance
+    for ch in short:
+        alive = False
+        for k in range(max_distance, -1, -1):
+            found = long.find(ch, positions[k]) + 1 if positions[k] < missing else 0
+            best = found if found else missing
+            if k and positions[k - 1] < best:
+                best = positions[k - 1]
+            positions[k] = best
+            alive = alive or best < missing
+        if not alive:
+            return None
+    for k, position in enumerate(positions):
+        if position < missing:
+            return k
+    return None
+
+
+class FieldIndex:
+    """
+    Inverted index over the distinct values of one catalog column.
+
+    The search distance is the minimum of three weighted Levenshtein distances, which
+    collapses to `min(len(a), len(b)) - LCS(a, b)`: the shorter string, minus at most
+    `max_distance` characters, must be a subsequence of the longer one. Subsequences do
+    not keep adjacent characters together, so contiguous trigrams cannot prune without
+    losing matches. The index therefore posts single characters (1-grams) and uses a
+    character bitmask as the necessary condition before the exact distance check.
+    """
+
+    def __init__(self, values: list[str]):
+        self.values = values
+        self.lengths = [len(value) for value in values]
+        self.masks = [char_mask(value) for value in values]
+        self.postings = defaultdict(set)
+        self.by_length = defaultdict(list)
+        for value_id, value in enumerate(values):
+            for ch in set(value):
+                self.postings[ch].add(value_id)
+            self.by_length[len(value)].append(value_id)
+
+    def candidates(self, query: str, max_distance: int = MAX_DISTANCE) -> set[int]:
+        """Value ids that can possibly be within `max_distance` of `query`."""
+        query_chars = set(query)
+        query_mask = char_mask(query)
+        found = set()
+
+        # Values at least as long as the query must contain all but `max_distance`
+        # of its distinct characters, so they appear in one of the rarest postings.
+        rarest = sorted(query_chars, key=lambda ch: len(self.postings.get(ch, ())))
+        for ch in rarest[:max_distance + 1]:
+            for value_id in self.postings.get(ch, ()):
+                if self.lengths[value_id] >= len(query):
+                    found.add(value_id)
+        if len(query_chars) <= max_distance:
+            for length, value_ids in self.by_length.items():
+                if length >= len(query):
+                    found.update(value_ids)
+        found = {
+            value_id for value_id in found
+            if bin(query_mask & ~self.masks[value_id]).count("1") <= max_distance
+        }
+
+        # Shorter values must have almost all of their own characters in the query.
+        for length, value_ids in self.by_length.items():
+            if length >= len(query):
+                continue
+            for value_id in value_ids:
+                if bin(self.masks[value_id] & ~query_mask).count("1") <= max_distance:
+                    found.add(value_id)
+        return found
+
+    def search(self, query: str, max_distance: int = MAX_DISTANCE) -> dict[int, int]:
+        """Map of value id to distance for every value within `max_distance` of `query`."""
+        matches = {}
+        for value_id in self.candidates(query, max_distance):
+            distance = bounded_distance(query, self.values[value_id], max_distance)
+            if distance is not None:
+                matches[value_id] = distance
+        return matches
+
+
+class FoodCatalogIndex:
+    """In-process search index over the `foods` table, built once and reused across calls."""
+
+    def __init__(self, rows: list[tuple], version: int = None):
+        self.rows = rows
+        self.version = version
+        self.food_names, self.food_rows = self._group(rows, 1)
+        self.restaurant_names, self.restaurant_rows = self._group(rows, 3)
+        self.food_index = FieldIndex(self.food_names)
+        self.restaurant_index = FieldIndex(self.restaurant_names)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_db(cls):
+        database.get_connection().executescript(VERSION_SCHEMA)
+        # Read the version first: a write landing in between only causes one extra rebuild.
+        version = catalog_version()
+        return cls(database.fetchall("SELECT id, food_name, food_category, restaurant_name, price FROM foods"), version)
+
+    @staticmethod
+    def _group(rows, column):
+        # Restaurant (and many food) names repeat across rows, so each distinct
+        # lower-cased value is matched once and fanned out to its rows.
+        values, value_rows, ids = [], [], {}
+        for row_number, row in enumerate(rows):
+            value = row[column].lower()
+            if value not in ids:
+                ids[value] = len(values)
+                values.append(value)
+                value_rows.append([])
+            value_rows[ids[value]].append(row_number)
+        return values, value_rows
+
+    @staticmethod
+    def _expand(matches, value_rows):
+        distances = {}
+        for value_id, distance in matches.items():
+            for row_number in value_rows[value_id]:
+                distances[row_number] = distance
+        return distances
+
+    def _search(self, food_name, restaurant_name, max_distance):
+        food_distances = restaurant_distances = None
+        if food_name:
+            food_distances = self._expand(self.food_index.search(food_name, max_distance), self.food_rows)
+        if restaurant_name:
+            restaurant_distances = self._expand(
+                self.restaurant_index.search(restaurant_name, max_distance), self.restaurant_rows)
+
+        if food_distances is not None and restaurant_distances is not None:
+            distances = {
+                row_number: min(distance, restaurant_distances[row_number])
+                for row_number, distance in food_distances.items()
+                if row_number in restaurant_distances
+            }
+        else:
+            distances = food_distances if food_distances is not None else restaurant_distances or {}
+
+        matches = []
+        # Walk rows in table order so ties keep the order of the original full scan.
+        for row_number in sorted(distances):
+            food_id, db_food_name, food_category, db_restaurant_name, db_price = self.rows[row_number]
+            matches.append({
+                'id': food_id,
+                'food_name': db_food_name,
+                'food_category': food_category,
+                'restaurant_name': db_restaurant_name,
+                'price': db_price,
+                'edit_distance': distances[row_number]
+            })
+        matches.sort(key=lambda x: x['edit_distance'])
+        return matches
+
+    def search(self, food_name: str = None, restaurant_name: str = None, max_distance: int = MAX_DISTANCE) -> list[dict]:
+        """Fuzzy search by food and/or restaurant name, memoized on the normalized pair."""
+        key = (normalize(food_name), normalize(restaurant_name), max_distance)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return [dict(match) for match in self._cache[key]]
+
+        matches = self._search(key[0], key[1], max_distance)
+
+        with self._lock:
+            self._cache[key] = matches
+            if len(self._cache) > RESULT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return [dict(match) for match in matches]
+
+
+_catalog_index = None
+_catalog_lock = threading.Lock()
+
+
+def catalog_version():
+    """The `foods` table's write counter, or None before the index has set it up."""
+    try:
+        return database.fetchone("SELECT version FROM catalog_version WHERE id = 0")[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def get_catalog_index() -> FoodCatalogIndex:
+    """Return the shared catalog index, (re)building it from `foods` on first use and after catalog edits."""
+    global _catalog_index
+    index = _catalog_index
+    if index is None or index.version != catalog_version():
+        with _catalog_lock:
+            if _catalog_index is None or _catalog_index.version != catalog_version():
+                _catalog_index = FoodCatalogIndex.from_db()
+            index = _catalog_index
+    return index
+
+
+def reset_catalog_index():
+    """Drop the shared index (and its result cache) so the next search rebuilds it."""
+    global _catalog_index
+    with _catalog_lock:
+        _catalog_index = None
@@ -0,0 +1,603 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.memory import MemorySaver
+import database
+
+
+# Both primary keys lead with thread_id, so they double as the thread_id index
+# used by every lookup (latest checkpoint, checkpoint by id, pending writes).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+CHECKPOINT_COLUMNS = ("thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                      "type, checkpoint, metadata_type, metadata")
+WRITE_COLUMNS = "thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path"
+
+
+def _row_to_tuple(serde, row, write_rows) -> CheckpointTuple:
+    thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+    return CheckpointTuple(
+        config={
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        },
+        checkpoint=serde.loads_typed((type_, checkpoint)),
+        metadata=serde.loads_typed((metadata_type, metadata)),
+        parent_config=(
+            {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_checkpoint_id,
+                }
+            }
+            if parent_checkpoint_id
+            else None
+        ),
+        pending_writes=[
+            (task_id, channel, serde.loads_typed((type_, value)))
+            for _, _, _, task_id, _, channel, type_, value, _ in write_rows
+        ],
+    )
+
+
+def _write_rows(serde, config: RunnableConfig, writes, task_id: str, task_path: str) -> list[tuple]:
+    thread_id = config["configurable"]["thread_id"]
+    checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+    checkpoint_id = config["configurable"]["checkpoint_id"]
+    rows = []
+    for idx, (channel, value) in enumerate(writes):
+        type_, serialized_value = serde.dumps_typed(value)
+        rows.append((
+            thread_id, checkpoint_ns, checkpoint_id, task_id,
+            WRITES_IDX_MAP.get(channel, idx), channel, type_, serialized_value, task_path,
+        ))
+    return rows
+
+
+def _checkpoint_row(serde, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> tuple:
+    type_, serialized_checkpoint = serde.dumps_typed(checkpoint)
+    metadata_type, serialized_metadata = serde.dumps_typed(metadata)
+    return (
+        config["configurable"]["thread_id"],
+        config["configurable"].get("checkpoint_ns", ""),
+        checkpoint["id"],
+        config["configurable"].get("checkpoint_id"),
+        type_,
+        serialized_checkpoint,
+        metadata_type,
+        serialized_metadata,
+    )
+
+
+def _saved_config(row) -> RunnableConfig:
+    return {"configurable": {"thread_id": row[0], "checkpoint_ns": row[1], "checkpoint_id": row[2]}}
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[int]):
+    """
+    File-backed LangGraph checkpointer.
+
+    Every checkpoint is committed to `path`, so a `thread_id` created by one Chainlit
+    worker can be resumed by any other worker on the same box (or after a restart).
+    Each thread gets its own WAL-mode connection; WAL lets workers read while one of
+    them writes, and the busy timeout queues concurrent writers instead of failing.
+    """
+
+    def __init__(self, path: str, *, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = database.connect(self.path)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.rollback()
+            raise
+        else:
+            connection.commit()
+
+    def _load_writes(self, connection, thread_id, checkpoint_ns, checkpoint_id):
+        return connection.execute(
+            f"SELECT {WRITE_COLUMNS} FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+
+    def _to_tuple(self, connection, row) -> CheckpointTuple:
+        return _row_to_tuple(self.serde, row, self._load_writes(connection, *row[:3]))
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        connection = self._connection()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        if checkpoint_id := get_checkpoint_id(config):
+            row = connection.execute(
+                f"SELECT {CHECKPOINT_COLUMNS} FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchone()
+        else:
+            row = connection.execute(
+                f"SELECT {CHECKPOINT_COLUMNS} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._to_tuple(connection, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        connection = self._connection()
+        query = f"SELECT {CHECKPOINT_COLUMNS} FROM checkpoints"
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        for row in connection.execute(query, params).fetchall():
+            if limit is not None and limit <= 0:
+                break
+            checkpoint_tuple = self._to_tuple(connection, row)
+            if filter and not all(
+                checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()
+            ):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        row = _checkpoint_row(self.serde, config, checkpoint, metadata)
+        with self._transaction() as connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO checkpoints ({CHECKPOINT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+        return _saved_config(row)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        # Special writes (errors, interrupts, ...) replace earlier ones; regular
+        # channel writes from a retried task keep the first copy.
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = _write_rows(self.serde, config, writes, task_id, task_path)
+        # All writes of a task land in one transaction instead of one commit per channel.
+        with self._transaction() as connection:
+            connection.executemany(
+                f"{verb} INTO writes ({WRITE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            connection.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def dump_thread(self, thread_id: str) -> tuple[list, list]:
+        """Raw checkpoint and write rows of a thread, as stored."""
+        connection = self._connection()
+        return (
+            connection.execute(
+                f"SELECT {CHECKPOINT_COLUMNS} FROM checkpoints WHERE thread_id = ?", (thread_id,)).fetchall(),
+            connection.execute(
+                f"SELECT {WRITE_COLUMNS} FROM writes WHERE thread_id = ?", (thread_id,)).fetchall(),
+        )
+
+    def load_rows(self, checkpoint_rows: list, write_rows: list) -> None:
+        """Store rows produced by `dump_thread` (or a compatible saver)."""
+        with self._transaction() as connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO checkpoints ({CHECKPOINT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                checkpoint_rows)
+            connection.executemany(
+                f"INSERT OR REPLACE INTO writes ({WRITE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", write_rows)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class _ThreadCheckpoints:
+    def __init__(self):
+        # checkpoint_ns -> checkpoint_id -> checkpoint row, oldest first
+        self.checkpoints = defaultdict(OrderedDict)
+        # (checkpoint_ns, checkpoint_id) -> (task_id, idx) -> write row
+        self.writes = defaultdict(dict)
+        self.bytes = 0
+        self.last_access = time.monotonic()
+
+    def rows(self) -> tuple[list, list]:
+        checkpoint_rows = [row for by_id in self.checkpoints.values() for row in by_id.values()]
+        write_rows = [row for by_task in self.writes.values() for row in by_task.values()]
+        return checkpoint_rows, write_rows
+
+
+def _row_bytes(row) -> int:
+    return sum(len(value) for value in row if isinstance(value, (bytes, str)))
+
+
+class BoundedMemoryCheckpointer(BaseCheckpointSaver[int]):
+    """
+    In-process checkpointer with a memory budget.
+
+    Unlike `MemorySaver`, which keeps every checkpoint of every thread for the life of
+    the process, this keeps at most `max_checkpoints_per_thread` checkpoints per thread
+    (per checkpoint namespace, so an interrupted subgraph keeps its latest state) and
+    at most `max_bytes` of serialized state overall. When over budget, or when a thread
+    has been idle longer than `idle_ttl` seconds, least recently used threads are
+    evicted: dropped, or moved to a `SQLiteCheckpointer` at `spill_path` and loaded
+    back transparently the next time the thread is used.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_checkpoints_per_thread: int = 20,
+        idle_ttl: Optional[float] = None,
+        spill_path: Optional[str] = None,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.max_bytes = max_bytes
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.idle_ttl = idle_ttl
+        self.spill = SQLiteCheckpointer(spill_path, serde=self.serde) if spill_path else None
+        self._threads = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {"evictions": 0, "expirations": 0, "spilled": 0, "restored": 0, "pruned_checkpoints": 0}
+
+    def stats(self) -> dict:
+        """Thread count, resident bytes and eviction counters."""
+        with self._lock:
+            return {
+                "threads": len(self._threads),
+                "checkpoints": sum(
+                    len(by_id) for thread in self._threads.values() for by_id in thread.checkpoints.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self._stats,
+            }
+
+    def _thread(self, thread_id: str, create: bool = False) -> Optional[_ThreadCheckpoints]:
+        thread = self._threads.get(thread_id)
+        if thread is None and self.spill is not None:
+            checkpoint_rows, write_rows = self.spill.dump_thread(thread_id)
+            if checkpoint_rows:
+                thread = _ThreadCheckpoints()
+                self._threads[thread_id] = thread
+                for row in checkpoint_rows:
+                    self._add_checkpoint(thread, row)
+                for row in write_rows:
+                    self._add_write(thread, row, replace=True)
+                self.spill.delete_thread(thread_id)
+                self._stats["restored"] += 1
+        if thread is None and create:
+            thread = _ThreadCheckpoints()
+            self._threads[thread_id] = thread
+        if thread is not None:
+            thread.last_access = time.monotonic()
+            self._threads.move_to_end(thread_id)
+        return thread
+
+    def _add_checkpoint(self, thread, row):
+        by_id = thread.checkpoints[row[1]]
+        if row[2] in by_id:
+            self._account(thread, -_row_bytes(by_id[row[2]]))
+        by_id[row[2]] = row
+        self._account(thread, _row_bytes(row))
+        # Keep the namespace sorted by checkpoint id (ids are time-ordered).
+        if len(by_id) > 1 and next(reversed(by_id)) != max(by_id):
+            thread.checkpoints[row[1]] = OrderedDict(sorted(by_id.items()))
+
+    def _add_write(self, thread, row, replace: bool):
+        by_task = thread.writes[(row[1], row[2])]
+        key = (row[3], row[4])
+        if key in by_task:
+            if not replace:
+                return
+            self._account(thread, -_row_bytes(by_task[key]))
+        by_task[key] = row
+        self._account(thread, _row_bytes(row))
+
+    def _account(self, thread, delta: int):
+        thread.bytes += delta
+        self._bytes += delta
+
+    def _prune(self, thread, checkpoint_ns: str):
+        by_id = thread.checkpoints[checkpoint_ns]
+        while len(by_id) > self.max_checkpoints_per_thread:
+            checkpoint_id, row = by_id.popitem(last=False)
+            self._account(thread, -_row_bytes(row))
+            for write in thread.writes.pop((checkpoint_ns, checkpoint_id), {}).values():
+                self._account(thread, -_row_bytes(write))
+            self._stats["pruned_checkpoints"] += 1
+
+    def _evict(self, thread_id: str, reason: str):
+        thread = self._threads.pop(thread_id)
+        self._bytes -= thread.bytes
+        if self.spill is not None:
+            self.spill.load_rows(*thread.rows())
+            self._stats["spilled"] += 1
+        self._stats[reason] += 1
+
+    def _enforce_limits(self, current_thread_id: str):
+        if self.idle_ttl is not None:
+            deadline = time.monotonic() - self.idle_ttl
+            for thread_id, thread in list(self._threads.items()):
+                if thread.last_access >= deadline:
+                    break
+                if thread_id != current_thread_id:
+                    self._evict(thread_id, "expirations")
+        while self._bytes > self.max_bytes and len(self._threads) > 1:
+            thread_id = next(iter(self._threads))
+            if thread_id == current_thread_id:
+                break
+            self._evict(thread_id, "evictions")
+
+    def _write_rows_for(self, thread, checkpoint_ns: str, checkpoint_id: str):
+        return sorted(thread.writes.get((checkpoint_ns, checkpoint_id), {}).values(), key=lambda row: (row[3], row[4]))
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            thread = self._thread(thread_id)
+            if thread is None or not thread.checkpoints.get(checkpoint_ns):
+                return None
+            by_id = thread.checkpoints[checkpoint_ns]
+            if checkpoint_id := get_checkpoint_id(config):
+                row = by_id.get(checkpoint_id)
+            else:
+                row = by_id[next(reversed(by_id))]
+            if row is None:
+                return None
+            write_rows = self._write_rows_for(thread, checkpoint_ns, row[2])
+        return _row_to_tuple(self.serde, row, write_rows)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        with self._lock:
+            if config:
+                thread = self._thread(config["configurable"]["thread_id"])
+                threads = [thread] if thread else []
+            else:
+                threads = list(self._threads.values())
+            config_checkpoint_ns = config["configurable"].get("checkpoint_ns") if config else None
+            config_checkpoint_id = get_checkpoint_id(config) if config else None
+            before_checkpoint_id = get_checkpoint_id(before) if before else None
+            selected = []
+            for thread in threads:
+                for checkpoint_ns, by_id in thread.checkpoints.items():
+                    if config_checkpoint_ns is not None and checkpoint_ns != config_checkpoint_ns:
+                        continue
+                    for checkpoint_id, row in by_id.items():
+                        if config_checkpoint_id and checkpoint_id != config_checkpoint_id:
+                            continue
+                        if before_checkpoint_id and checkpoint_id >= before_checkpoint_id:
+                            continue
+                        selected.append((row, self._write_rows_for(thread, checkpoint_ns, checkpoint_id)))
+        selected.sort(key=lambda item: item[0][2], reverse=True)
+        for row, write_rows in selected:
+            if limit is not None and limit <= 0:
+                break
+            checkpoint_tuple = _row_to_tuple(self.serde, row, write_rows)
+            if filter and not all(
+                checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()
+            ):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        row = _checkpoint_row(self.serde, config, checkpoint, metadata)
+        with self._lock:
+            thread = self._thread(row[0], create=True)
+            self._add_checkpoint(thread, row)
+            self._prune(thread, row[1])
+            self._enforce_limits(row[0])
+        return _saved_config(row)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        rows = _write_rows(self.serde, config, writes, task_id, task_path)
+        with self._lock:
+            thread = self._thread(config["configurable"]["thread_id"], create=True)
+            for row in rows:
+                self._add_write(thread, row, replace)
+            self._enforce_limits(config["configurable"]["thread_id"])
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            thread = self._threads.pop(thread_id, None)
+            if thread is not None:
+                self._bytes -= thread.bytes
+        if self.spill is not None:
+            self.spill.delete_thread(thread_id)
+
+    async def _run(self, func, *args, **kwargs):
+        # In memory alone the calls are quick; with a spill store they may read or write
+        # SQLite, so they run off the event loop like SQLiteCheckpointer's.
+        if self.spill is None:
+            return func(*args, **kwargs)
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await self._run(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self._run(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await self._run(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await self._run(self.delete_thread, thread_id)
+
+
+def create_checkpointer(kind: str, path: str = None, **options) -> BaseCheckpointSaver:
+    """Build the checkpointer named in config (`memory`, `bounded` or `sqlite`)."""
+    if kind == "memory":
+        return MemorySaver()
+    if kind == "bounded":
+        return BoundedMemoryCheckpointer(**options)
+    if kind == "sqlite":
+        return SQLiteCheckpointer(path)
+    raise ValueError(f"Unknown checkpointer {kind!r}, expected 'memory', 'bounded' or 'sqlite'.")
@@ -1,4 +1,4 @@
-
+import os
 from langchain_community.chat_models import ChatOpenAI
 from langchain_openai import ChatOpenAI
 
@@ -6,3 +6,133 @@ from langchain_openai import ChatOpenAI
 
 BASE_URL = "https://api.avalai.ir/v1"
 llm = ChatOpenAI(model="gpt-4o-mini", base_url=BASE_URL, temperature=0.2, max_tokens=2048)
+
+# Conversation state: "memory" keeps it in-process, "bounded" keeps it in-process within the
+# limits below, "sqlite" persists it to CHECKPOINT_DB_PATH so every Chainlit worker on the box
+# can resume any thread_id.
+CHECKPOINTER = os.getenv("CHECKPOINTER", "memory")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.db")
+CHECKPOINT_OPTIONS = {
+    "max_bytes": int(os.getenv("CHECKPOINT_MAX_BYTES", str(256 * 1024 * 1024))),
+    "max_checkpoints_per_thread": int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20")),
+    # Idle seconds before a thread is evicted; unset keeps idle threads until memory runs out.
+    "idle_ttl": float(os.environ["CHECKPOINT_IDLE_TTL"]) if os.getenv("CHECKPOINT_IDLE_TTL") else None,
+    # Evicted threads are moved here instead of dropped, if set.
+    "spill_path": os.getenv("CHECKPOINT_SPILL_PATH") or None,
+}
+
+# Semantic cache in front of document_search: paraphrased questions whose embeddings are at
+# least this similar reuse the cached hybrid search results.
+DOC_CACHE_SIMILARITY = float(os.getenv("DOC_CACHE_SIMILARITY", "0.92"))
+DOC_CACHE_MAX_ENTRIES = int(os.getenv("DOC_CACHE_MAX_ENTRIES", "512"))
+DOC_CACHE_VERSION_CHECK_SECONDS = int(os.getenv("DOC_CACHE_VERSION_CHECK_SECONDS", "60"))
+
+# Embedding backend for queries and parse.py (see embeddings.py): "torch" is full-precision
+# sentence-transformers (what the food table was built with), "onnx" the same weights on ONNX
+# Runtime, "onnx-int8" dynamically int8-quantized ONNX, exported once to EMBEDDING_CACHE_DIR.
+# The ONNX backends need optimum[onnxruntime].
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "avx2")  # arm64, avx2, avx512, avx512_vnni
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "models")
+
+# Tool calls the model makes in one message run concurrently, at most this many at a time.
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+
+# Local response cache for deterministic, repeated LLM calls. A node's calls are cached only
+# if it is listed in LLM_CACHE_NODES; routing through primary_assistant is left out by default
+# so the conversation flow always reflects the live model.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL = float(os.environ["LLM_CACHE_TTL"]) if os.getenv("LLM_CACHE_TTL") else 7 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_NODES = set(
+    os.getenv(
+        "LLM_CACHE_NODES",
+        "filter,content_grader,generate,fast_rag,doc_retrieval,web_search,summarize_conversation",
+    ).split(",")
+)
+
+llm_cache = None
+if LLM_CACHE_ENABLED:
+    from llm_cache import SQLiteLLMCache
+
+    llm_cache = SQLiteLLMCache(LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
+
+
+def llm_for(node: str) -> ChatOpenAI:
+    """The shared model, with the response cache attached if `node` opted into it."""
+    if llm_cache is not None and node in LLM_CACHE_NODES:
+        return llm.model_copy(update={"cache": llm_cache})
+    return llm
+
+# Print, per graph node, how many leading prompt tokens are unchanged from the previous turn.
+PROMPT_PREFIX_CHECK = os.getenv("PROMPT_PREFIX_CHECK", "false").lower() in ("1", "true", "yes")
+
+# Local intent router ahead of primary_assistant: turns it classifies with at least this
+# confidence skip the primary LLM call. Decisions are appended to INTENT_ROUTER_LOG_PATH.
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.85"))
+INTENT_ROUTER_MIN_MARGIN = float(os.getenv("INTENT_ROUTER_MIN_MARGIN", "0.05"))
+INTENT_ROUTER_LOG_PATH = os.getenv("INTENT_ROUTER_LOG_PATH", "logs/intent_router.jsonl") or None
+# The classifier's own embedding model, loaded without the LanceDB table, so routing a turn
+# never pulls in the RAG stack.
+INTENT_ROUTER_EMBEDDING_MODEL = os.getenv("INTENT_ROUTER_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+
+# Doc retrieval answering: "multi_stage" runs filter -> content_grader -> generate; "fast" does
+# all three in one structured call and falls back to multi_stage if the content is insufficient.
+DOC_RAG_MODE = os.getenv("DOC_RAG_MODE", "multi_stage")
+
+# Web search backend: "tavily", or "local" for an offline stand-in that searches the JSON list
+# of {"url", "content"} documents at WEB_SEARCH_LOCAL_PATH (optionally with simulated latency).
+WEB_SEARCH_PROVIDER = os.getenv("WEB_SEARCH_PROVIDER", "tavily")
+WEB_SEARCH_LOCAL_PATH = os.getenv("WEB_SEARCH_LOCAL_PATH") or None
+WEB_SEARCH_LOCAL_LATENCY = float(os.getenv("WEB_SEARCH_LOCAL_LATENCY", "0"))
+
+# On-disk cache of web search results (see web_search_cache.py), keyed by normalized query;
+# concurrent identical searches share one API call.
+WEB_SEARCH_CACHE_ENABLED = os.getenv("WEB_SEARCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+WEB_SEARCH_CACHE_PATH = os.getenv("WEB_SEARCH_CACHE_PATH", "web_search_cache.db")
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", str(6 * 3600)))
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+# Start the web search alongside document search; keep its results only if the best local
+# relevance score is below SPECULATIVE_WEB_MIN_SCORE, otherwise discard them.
+SPECULATIVE_WEB_SEARCH = os.getenv("SPECULATIVE_WEB_SEARCH", "false").lower() in ("1", "true", "yes")
+SPECULATIVE_WEB_MIN_SCORE = float(os.getenv("SPECULATIVE_WEB_MIN_SCORE", "0.8"))
+
+# Preload models, indexes and connections when the Chainlit server starts (see warmup.py).
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Per-node latency and token records (see tracing.py), appended to TRACE_LOG_PATH as JSON lines
+# by a background thread and served in Prometheus format on /metrics.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "logs/node_traces.jsonl") or None
+
+# Tokens spent per thread_id and node, kept in TOKEN_LEDGER_PATH (needs TRACING_ENABLED). Once a
+# turn or thread uses TOKEN_BUDGET_SOFT_RATIO of its budget (0 = unlimited), the graph switches
+# to cheaper paths: earlier summarization (past TOKEN_BUDGET_SUMMARY_TOKENS of history), fast RAG
+# answers and no suggestion reflection loop.
+TOKEN_ACCOUNTING_ENABLED = os.getenv("TOKEN_ACCOUNTING_ENABLED", "true").lower() in ("1", "true", "yes")
+TOKEN_LEDGER_PATH = os.getenv("TOKEN_LEDGER_PATH", "token_usage.db")
+TOKEN_BUDGET_PER_TURN = int(os.getenv("TOKEN_BUDGET_PER_TURN", "60000"))
+TOKEN_BUDGET_PER_THREAD = int(os.getenv("TOKEN_BUDGET_PER_THREAD", "500000"))
+TOKEN_BUDGET_SOFT_RATIO = float(os.getenv("TOKEN_BUDGET_SOFT_RATIO", "0.8"))
+TOKEN_BUDGET_SUMMARY_TOKENS = int(os.getenv("TOKEN_BUDGET_SUMMARY_TOKENS", "1000"))
+
+# Assistant nodes re-ask the model at most ASSISTANT_MAX_RETRIES times per node run after an
+# unusable answer, waiting ASSISTANT_RETRY_BACKOFF seconds doubled per retry (capped at
+# ASSISTANT_RETRY_BACKOFF_MAX), and never past ASSISTANT_RETRY_DEADLINE seconds (see retry_policy.py).
+ASSISTANT_MAX_RETRIES = int(os.getenv("ASSISTANT_MAX_RETRIES", "1"))
+ASSISTANT_RETRY_BACKOFF = float(os.getenv("ASSISTANT_RETRY_BACKOFF", "0.5"))
+ASSISTANT_RETRY_BACKOFF_MAX = float(os.getenv("ASSISTANT_RETRY_BACKOFF_MAX", "4"))
+ASSISTANT_RETRY_DEADLINE = float(os.getenv("ASSISTANT_RETRY_DEADLINE", "30"))
+
+# Conversation summary, measured in tokens of message history: once it exceeds
+# SUMMARY_TRIGGER_TOKENS, everything but the most recent turns (up to SUMMARY_KEEP_TOKENS) is
+# folded into the summary. With SUMMARY_IN_BACKGROUND that happens after a turn ends and is
+# committed to the checkpoint for the next turn; a turn itself only waits for one past
+# SUMMARY_BLOCKING_TOKENS.
+SUMMARY_IN_BACKGROUND = os.getenv("SUMMARY_IN_BACKGROUND", "true").lower() in ("1", "true", "yes")
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("SUMMARY_TRIGGER_TOKENS", "3000"))
+SUMMARY_KEEP_TOKENS = int(os.getenv("SUMMARY_KEEP_TOKENS", "1000"))
+SUMMARY_BLOCKING_TOKENS = int(os.getenv("SUMMARY_BLOCKING_TOKENS", "12000"))
@@ -0,0 +1,201 @@
+import os
+import sqlite3
+import threading
+import time
+import weakref
+import atexit
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+
+DB_PATH = os.getenv("FOOD_ORDERS_DB", "food_orders.db")
+BUSY_TIMEOUT_MS = 5000
+CACHED_STATEMENTS = 128
+MAX_WORKERS = int(os.getenv("FOOD_ORDERS_DB_WORKERS", "4"))
+EVICT_EVERY = 64  # writes between LRU size checks of a cache table
+
+_local = threading.local()
+_lock = threading.Lock()
+_connections = []  # (weak reference to the owning thread, connection)
+_generation = 0
+_executor = None
+_stats = {
+    "connections_opened": 0,
+    "connect_time": 0.0,
+    "queries": 0,
+    "query_time": 0.0,
+}
+
+
+def configure(db_path: str):
+    """Point the shared connections at another database file (closes the open ones)."""
+    global DB_PATH
+    close_all()
+    DB_PATH = db_path
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a WAL-mode, autocommit connection with the shared busy timeout and statement cache."""
+    # isolation_level=None: statements autocommit unless wrapped in a transaction.
+    connection = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=False,
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class LRUEviction:
+    """
+    Keeps a cache table (with `key` and `last_used_at` columns) within `max_entries` rows,
+    dropping the least recently used.
+
+    Counting the rows scans the table, so the size is checked once every `every` writes
+    (at most a tenth of the cap) instead of on each one; in between, each process may add
+    that many rows past the cap.
+    """
+
+    def __init__(self, table: str, max_entries: int, every: int = EVICT_EVERY):
+        self.table = table
+        self.max_entries = max_entries
+        self.every = max(1, min(every, max_entries // 10))
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def after_write(self, connection: sqlite3.Connection) -> int:
+        """Call after each insert; returns how many rows were evicted."""
+        with self._lock:
+            self._writes += 1
+            if self._writes < self.every:
+                return 0
+            self._writes = 0
+        count = connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return 0
+        connection.execute(
+            f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY last_used_at LIMIT ?)",
+            (overflow,),
+        )
+        return overflow
+
+
+def _alive(thread_ref) -> bool:
+    thread = thread_ref()
+    return thread is not None and thread.is_alive()
+
+
+def _close(connections):
+    for connection in connections:
+        try:
+            connection.close()
+        except sqlite3.ProgrammingError:
+            pass
+
+
+def _connect() -> sqlite3.Connection:
+    start = time.perf_counter()
+    connection = connect(DB_PATH)
+    with _lock:
+        # Threads of a churning pool exit with their connection still open; close those here.
+        dead = [old for thread_ref, old in _connections if not _alive(thread_ref)]
+        _connections[:] = [entry for entry in _connections if _alive(entry[0])]
+        _connections.append((weakref.ref(threading.current_thread()), connection))
+        _stats["connections_opened"] += 1
+        _stats["connect_time"] += time.perf_counter() - start
+    _close(dead)
+    return connection
+
+
+def get_connection() -> sqlite3.Connection:
+    """Return this thread's connection to `DB_PATH`, opening it on first use."""
+    connection = getattr(_local, "connection", None)
+    if connection is None or getattr(_local, "generation", None) != _generation:
+        connection = _connect()
+        _local.connection = connection
+        _local.generation = _generation
+    return connection
+
+
+def execute(query: str, params: tuple = (), connection: sqlite3.Connection = None) -> sqlite3.Cursor:
+    """Run a statement on the thread's connection, recording its timing."""
+    connection = connection or get_connection()
+    start = time.perf_counter()
+    cursor = connection.execute(query, params)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _stats["queries"] += 1
+        _stats["query_time"] += elapsed
+    return cursor
+
+
+def fetchone(query: str, params: tuple = ()):
+    return execute(query, params).fetchone()
+
+
+def fetchall(query: str, params: tuple = ()):
+    return execute(query, params).fetchall()
+
+
+@contextmanager
+def transaction():
+    """
+    Run a read-then-write sequence atomically.
+
+    `BEGIN IMMEDIATE` takes the write lock up front, so two sessions cancelling the
+    same order cannot both read 'preparation' before either one writes.
+    """
+    connection = get_connection()
+    execute("BEGIN IMMEDIATE", connection=connection)
+    try:
+        yield connection
+    except BaseException:
+        connection.rollback()
+        raise
+    else:
+        connection.commit()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="food-orders-db")
+        return _executor
+
+
+async def arun(func, *args, **kwargs):
+    """
+    Await a blocking database function on the bounded DB worker pool.
+
+    Each worker keeps its own connection, so at most `MAX_WORKERS` connections serve
+    every async caller and a burst of tool calls queues instead of spawning threads.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(func, *args, **kwargs))
+
+
+def stats() -> dict:
+    """Connection and query counters since start-up."""
+    with _lock:
+        return {**_stats, "open_connections": len(_connections)}
+
+
+def close_all():
+    """Close every connection handed out so far (each thread reconnects on next use)."""
+    global _generation
+    with _lock:
+        _generation += 1
+        connections = [connection for _, connection in _connections]
+        _connections.clear()
+    _close(connections)
+
+
+atexit.register(close_all)
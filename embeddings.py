@@ -0,0 +1,79 @@
+import os
+import threading
+import numpy as np
+from lancedb.embeddings import register, TextEmbeddingFunction
+from config import EMBEDDING_BACKEND, EMBEDDING_QUANTIZATION, EMBEDDING_CACHE_DIR
+
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+_lock = threading.Lock()
+_embedders = {}
+
+
+def _quantized_model(model_name: str):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    local_path = os.path.join(EMBEDDING_CACHE_DIR, model_name.replace("/", "--") + "-onnx")
+    file_name = f"onnx/model_qint8_{EMBEDDING_QUANTIZATION}.onnx"
+    if not os.path.exists(os.path.join(local_path, file_name)):
+        # Quantize once and keep the result next to the app; later loads are offline.
+        model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+        model.save(local_path)
+        export_dynamic_quantized_onnx_model(model, EMBEDDING_QUANTIZATION, local_path)
+    return SentenceTransformer(local_path, backend="onnx", device="cpu", model_kwargs={"file_name": file_name})
+
+
+def load_model(model_name: str, backend: str):
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name, device="cpu")
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx", device="cpu")
+    if backend == "onnx-int8":
+        return _quantized_model(model_name)
+    raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {BACKENDS}")
+
+
+class Embedder:
+    """A sentence-transformers model on one backend, producing normalized float32 vectors."""
+
+    def __init__(self, model_name: str, backend: str):
+        self.model_name = model_name
+        self.backend = backend
+        self.model = load_model(model_name, backend)
+
+    @property
+    def ndims(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        # normalize_embeddings matches LanceDB's sentence-transformers function.
+        return self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+    def embed_query(self, query: str) -> list[float]:
+        return self.embed([query])[0].tolist()
+
+
+def get_embedder(model_name: str, backend: str = EMBEDDING_BACKEND) -> Embedder:
+    """Shared embedder per (model, backend); the model is loaded on first use."""
+    key = (model_name, backend)
+    with _lock:
+        if key not in _embedders:
+            _embedders[key] = Embedder(model_name, backend)
+        return _embedders[key]
+
+
+@register("sentence-transformers-backend")
+class BackendEmbeddings(TextEmbeddingFunction):
+    """LanceDB embedding function that encodes through `get_embedder` (used by parse.py)."""
+
+    name: str = "BAAI/bge-small-en-v1.5"
+    backend: str = "onnx-int8"
+
+    def ndims(self):
+        return get_embedder(self.name, self.backend).ndims
+
+    def generate_embeddings(self, texts):
+        return get_embedder(self.name, self.backend).embed(list(texts)).tolist()
@@ -3,14 +3,21 @@ from langgraph.prebuilt import tools_condition
 from langgraph.graph import StateGraph, START, END
 from utilities import create_tool_node_with_fallback
 from typing import Callable
-from langchain_core.messages import ToolMessage
+import threading
+import time
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.utils.runnable import RunnableCallable
 from agents.doc_retrieval_agent import doc_retrieval_tools, doc_retrieval_runnable
 from agents.filter_agent import ToFilter, filter_runnable
 from agents.content_grader_agent import ToGradeContent, content_grader_runnable
 from agents.web_search_agent import web_search_runnable, web_search_tools
 from agents.generate_agent import ToGenerate, generate_runnable
+from agents.fast_rag_agent import fast_rag_runnable
 from agents.index import ToWebSearch
-from utilities import Assistant, State, create_entry_node
+from utilities import Assistant, State, create_entry_node, find_tool_call, skipped_tool_messages
+from config import DOC_RAG_MODE
+from token_budget import economy_mode
 
 
 
@@ -20,64 +27,180 @@ def route_filter(
     state: State,
 ):
     route = tools_condition(state)
-    tool_calls = state["messages"][-1].tool_calls
-    if tool_calls:
-        if tool_calls[0]["name"] == ToGradeContent.__name__:
-            return "content_grader"
+    if find_tool_call(state["messages"][-1], ToGradeContent.__name__):
+        return "content_grader"
     return route
 
 def route_web_search(
     state: State,
 ):
-    tool_calls = state["messages"][-1].tool_calls
-    if tool_calls:
-        if tool_calls[0]["name"] == ToFilter.__name__:
-            return "enter_filter"
+    if find_tool_call(state["messages"][-1], ToFilter.__name__):
+        return "enter_filter"
     return "web_search_tools"
 
 def route_content_grader(
     state: State,
 ):
     route = tools_condition(state)
-    tool_calls = state["messages"][-1].tool_calls
-    if tool_calls:
-        if tool_calls[0]["name"] == ToGenerate.__name__:
-            return "enter_generate"
-        if tool_calls[0]["name"] == ToWebSearch.__name__:
-            return "enter_web_search"
+    tool_call = find_tool_call(state["messages"][-1], ToGenerate.__name__, ToWebSearch.__name__)
+    if tool_call:
+        return "enter_generate" if tool_call["name"] == ToGenerate.__name__ else "enter_web_search"
     return route
 
 
 def route_doc_retrieval(
     state: State,
 ):
-    tool_calls = state["messages"][-1].tool_calls
-    if tool_calls:
-        if tool_calls[0]["name"] == ToFilter.__name__:
-            return "enter_filter"
+    if find_tool_call(state["messages"][-1], ToFilter.__name__):
+        return "enter_filter"
     return "doc_retrieval_tools"
 
-def create_entry_node(assistant_name: str, new_dialog_state: str) -> Callable:
-    def entry_node(state: State) -> dict:
-        tool_call_id = state["messages"][-1].tool_calls[0]["id"]
-        return {
-            "messages": [
-                ToolMessage(
-    content=f"You are now operating as {assistant_name}. Focus on your defined role and responsibilities to assist the user effectively. "
-            f"Reflect on the prior conversation between the host assistant and the user to determine the appropriate course of action. "
-            "The user's intent remains unresolved, and your job is to address it by utilizing the provided tools to perform the required tasks. "
-            f"Remember, you are {assistant_name}"
-            "Do not disclose your identity or role to the user; focus solely on fulfilling your responsibilities and ensuring the user's needs are met.",
-        tool_call_id=tool_call_id,
-        name=assistant_name,
-        role="tool"
-)
+def route_answer_mode(
+    state: State,
+    config: RunnableConfig,
+):
+    """`route_doc_retrieval`, sending retrieved content to the one-call answer in fast mode
+    or when the thread is near its token budget."""
+    route = route_doc_retrieval(state)
+    if route == "enter_filter" and (DOC_RAG_MODE == "fast" or economy_mode(config)):
+        return "fast_answer"
+    return route
+
+
+# Latency and tokens of the answering stage (everything after retrieval), per mode:
+# "fast", "fast_fallback" (fast call said insufficient, then multi-stage) and "multi_stage".
+MAX_PENDING_RUNS = 1024
+_mode_lock = threading.Lock()
+_mode_stats = {}
+_pending = {}  # doc_retrieval ToFilter call id -> (mode, start time, tokens spent so far)
+
+
+def _usage_tokens(message) -> int:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens", 0) if usage else 0
+
+
+def _answer_stage(messages) -> tuple:
+    """The doc_retrieval `ToFilter` call id of the current run and its message index."""
+    start = 0
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], ToolMessage) and messages[index].name == "Doc Retrieval Assistant":
+            start = index
+            break
+    for index in range(start, len(messages)):
+        message = messages[index]
+        tool_call = find_tool_call(message, ToFilter.__name__) if isinstance(message, AIMessage) else None
+        if tool_call:
+            return tool_call["id"], index
+    return None, len(messages)
+
+
+def _start_answer_stage(key, mode, tokens=0, start=None):
+    with _mode_lock:
+        _pending.setdefault(key, (mode, start or time.perf_counter(), tokens))
+        while len(_pending) > MAX_PENDING_RUNS:
+            _pending.pop(next(iter(_pending)))
+
 
-            ],
-            "dialog_state": new_dialog_state,
+def _record_mode(mode, elapsed, tokens):
+    with _mode_lock:
+        stats = _mode_stats.setdefault(mode, {"runs": 0, "latency": 0.0, "tokens": 0})
+        stats["runs"] += 1
+        stats["latency"] += elapsed
+        stats["tokens"] += tokens
+
+
+def rag_mode_stats() -> dict:
+    """Per answering mode: runs, total and average latency (seconds) and total tokens."""
+    with _mode_lock:
+        return {
+            mode: {**stats, "avg_latency": stats["latency"] / stats["runs"], "avg_tokens": stats["tokens"] / stats["runs"]}
+            for mode, stats in _mode_stats.items()
         }
 
-    return entry_node
+
+def _fast_input(state: State):
+    call = find_tool_call(state["messages"][-1], ToFilter.__name__)
+    return call, {
+        "user_query": call["args"].get("user_query", ""),
+        "retrieved_content": call["args"].get("retrieved_content", ""),
+    }
+
+
+def _fast_output(message, call, result, start):
+    raw, parsed = result.get("raw"), result.get("parsed")
+    tokens = _usage_tokens(raw)
+    if parsed is None or not parsed.sufficient or not parsed.answer.strip():
+        # Leave the ToFilter call as the last message so enter_filter picks it up.
+        _start_answer_stage(call["id"], "fast_fallback", tokens, start)
+        return {}
+    _record_mode("fast", time.perf_counter() - start, tokens)
+    return {
+        "messages": [
+            ToolMessage(
+                content="Answered directly from the retrieved content.",
+                tool_call_id=call["id"],
+                name="Fast Answer",
+            ),
+            *skipped_tool_messages(message, call["id"]),
+            AIMessage(content=parsed.answer, usage_metadata=getattr(raw, "usage_metadata", None)),
+        ]
+    }
+
+
+def fast_answer(state: State):
+    """Filter, grade and answer in one structured call over the ToFilter arguments."""
+    start = time.perf_counter()
+    call, inputs = _fast_input(state)
+    try:
+        result = fast_rag_runnable.invoke(inputs)
+    except Exception as e:
+        print(e)
+        result = {}
+    return _fast_output(state["messages"][-1], call, result, start)
+
+
+async def afast_answer(state: State):
+    start = time.perf_counter()
+    call, inputs = _fast_input(state)
+    try:
+        result = await fast_rag_runnable.ainvoke(inputs)
+    except Exception as e:
+        print(e)
+        result = {}
+    return _fast_output(state["messages"][-1], call, result, start)
+
+
+def route_fast_answer(
+    state: State,
+):
+    if isinstance(state["messages"][-1], AIMessage) and not state["messages"][-1].tool_calls:
+        return END
+    return "enter_filter"
+
+
+def start_multi_stage(entry_node: Callable) -> Callable:
+    def node(state: State) -> dict:
+        key, _ = _answer_stage(state["messages"])
+        if key is not None:
+            _start_answer_stage(key, "multi_stage")
+        return entry_node(state)
+
+    return node
+
+
+def record_answer_stage(state: State) -> dict:
+    messages = state["messages"]
+    key, index = _answer_stage(messages)
+    with _mode_lock:
+        pending = _pending.pop(key, None)
+    if pending:
+        mode, start, tokens = pending
+        tokens += sum(_usage_tokens(message) for message in messages[index + 1:] if isinstance(message, AIMessage))
+        _record_mode(mode, time.perf_counter() - start, tokens)
+    return {}
+
+
 
 
 builder = StateGraph(State) 
@@ -101,24 +224,29 @@ builder.add_edge(START, "doc_retrieval")
 
 builder.add_node(
     "enter_filter",
-    create_entry_node("Content Filter", "filter"),
+    start_multi_stage(create_entry_node("Content Filter", "filter", ToFilter.__name__)),
 )
 builder.add_edge("enter_filter", "filter")
 builder.add_edge("doc_retrieval_tools", "doc_retrieval")
 
+# In fast mode (or near the token budget) retrieved content goes to the single-call answer
+# first; enter_filter is the fallback.
+builder.add_node("fast_answer", RunnableCallable(fast_answer, afast_answer))
 builder.add_conditional_edges(
     "doc_retrieval",
-    route_doc_retrieval,
+    route_answer_mode,
     [
         "enter_filter",
+        "fast_answer",
         "doc_retrieval_tools"
     ],
 )
+builder.add_conditional_edges("fast_answer", route_fast_answer, ["enter_filter", END])
 
 
 builder.add_node(
     "enter_content_grader",
-    create_entry_node("Content Grader", "content_grader"),
+    create_entry_node("Content Grader", "content_grader", ToGradeContent.__name__),
 )
 builder.add_edge(
     "filter",
@@ -146,17 +274,19 @@ builder.add_conditional_edges(
 
 builder.add_node(
     "enter_web_search",
-    create_entry_node("Web Search Assistant", "web_search"),
+    create_entry_node("Web Search Assistant", "web_search", ToWebSearch.__name__),
 )
 builder.add_edge("enter_web_search", "web_search")
 
 builder.add_edge("web_search_tools", "web_search")
 builder.add_node(
     "enter_generate",
-    create_entry_node("Answer Generate Assistant", "generate"),
+    create_entry_node("Answer Generate Assistant", "generate", ToGenerate.__name__),
 )
 builder.add_edge("enter_generate", "generate")
-builder.add_edge("generate", END)
+builder.add_node("record_answer_stage", record_answer_stage)
+builder.add_edge("generate", "record_answer_stage")
+builder.add_edge("record_answer_stage", END)
 
 
 
@@ -1,6 +1,6 @@
 from langgraph.graph import StateGraph, START, END
 from agents.food_search_agent import food_search_runnable, food_search_tools
-from utilities import Assistant, State, create_tool_node_with_fallback
+from utilities import Assistant, State, create_tool_node_with_fallback, find_tool_call
 from langgraph.prebuilt import tools_condition
 from tools import CompleteOrEscalate
 
@@ -8,10 +8,8 @@ def route_food_search(
     state: State,
 ):
     route = tools_condition(state)
-    tool_calls = state["messages"][-1].tool_calls
-    if tool_calls:
-        if tool_calls[0]["name"] == CompleteOrEscalate.__name__:
-            return END
+    if find_tool_call(state["messages"][-1], CompleteOrEscalate.__name__):
+        return END
     return route
 
 builder = StateGraph(State)
@@ -1,20 +1,30 @@
 from langgraph.graph import StateGraph, START, END
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_community.utilities.tavily_search import TavilySearchAPIWrapper
 from utilities import extract_last_tool_criteria, generate_human_message, filter_last_two_tool_messages, remove_unmatched_tool_messages
 from langchain_core.tools import StructuredTool
 from tools import available_food_search, CompleteOrEscalate
-from langgraph.prebuilt import ToolNode
+from langgraph.utils.runnable import RunnableCallable
 from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from token_budget import economy_mode
 
 from agents.reflextions_agents import (
     food_suggestion_runnable,
     food_revision_runnable,
+    food_suggestion_validator,
+    food_revision_validator,
     ReviseFoodRecommendation, FoodRecommendation)
-from utilities import Assistant, State
+from utilities import Assistant, State, ParallelToolNode, find_tool_call
+from search_providers import web_search_tool
 
-search = TavilySearchAPIWrapper()
-tavily_tool = TavilySearchResults(api_wrapper=search, max_results=5)
+_tavily_tool = None
+
+
+def get_tavily_tool():
+    """The search client for reflection queries, created on the first suggestion turn."""
+    global _tavily_tool
+    if _tavily_tool is None:
+        _tavily_tool = web_search_tool(max_results=5)
+    return _tavily_tool
 
 
 
@@ -23,13 +33,18 @@ tavily_tool = TavilySearchResults(api_wrapper=search, max_results=5)
 
 def run_queries(search_queries: list[str], **kwargs):
     """Run the generated queries."""
-    return tavily_tool.batch([{"query": query} for query in search_queries])
+    return get_tavily_tool().batch([{"query": query} for query in search_queries])
+
+
+async def arun_queries(search_queries: list[str], **kwargs):
+    """Run the generated queries."""
+    return await get_tavily_tool().abatch([{"query": query} for query in search_queries])
 
 
-tool_node = ToolNode(
+tool_node = ParallelToolNode(
     [
-        StructuredTool.from_function(run_queries, name=FoodRecommendation.__name__),
-        StructuredTool.from_function(run_queries, name=ReviseFoodRecommendation.__name__),
+        StructuredTool.from_function(run_queries, coroutine=arun_queries, name=FoodRecommendation.__name__),
+        StructuredTool.from_function(run_queries, coroutine=arun_queries, name=ReviseFoodRecommendation.__name__),
         available_food_search,
         CompleteOrEscalate
     ]
@@ -49,6 +64,11 @@ def _get_num_iterations(state: list):
     return i
 
 
+# Both nodes must answer with a tool call: the draft always goes on to execute_tools.
+first_responder = Assistant(food_suggestion_runnable, is_tools_based=True)
+revisor = Assistant(food_revision_runnable, is_tools_based=True)
+
+
 MAX_ITERATIONS = 1
 def route_food_suggestion(
     state: State,
@@ -57,24 +77,22 @@ def route_food_suggestion(
         tool_calls = state["messages"][-1].tool_calls
     else:
         tool_calls = None
-    if tool_calls and tool_calls[0]["name"] == CompleteOrEscalate.__name__:
+    if tool_calls and find_tool_call(state["messages"][-1], CompleteOrEscalate.__name__):
         return END
     # in our case, we'll just stop after N plans
 
     return "execute_tools"
 
-def draft_node(state: State):
-    first_responder = Assistant(food_suggestion_runnable)
-    
+def _draft_input(state: State):
     # ✅ Extract user intent (criteria & context)
     user_intent = extract_last_tool_criteria(state)
 
     # ✅ Generate a proper human-like message
     human_message = generate_human_message(user_intent)
-    
-    # ✅ Ensure the response is a valid list of messages
-    response_messages = first_responder.respond({"messages": [human_message]})
+    return {"messages": [human_message]}
+
 
+def _draft_output(response_messages):
     # ✅ Fix AI messages that have empty content
     for msg in response_messages:
         if isinstance(msg, AIMessage) and not msg.content:
@@ -82,11 +100,19 @@ def draft_node(state: State):
     return {"messages": [response_messages["messages"]]}
 
 
-def revisor_node(state: State):
-    num_iterations = _get_num_iterations(state["messages"])
-    if num_iterations > MAX_ITERATIONS:
-        print("@"*110)
-        return {"messages":[AIMessage(
+def draft_node(state: State):
+    # ✅ Ensure the response is a valid list of messages
+    response_messages = first_responder.respond(_draft_input(state), validator=food_suggestion_validator)
+    return _draft_output(response_messages)
+
+
+async def adraft_node(state: State):
+    response_messages = await first_responder.arespond(_draft_input(state), validator=food_suggestion_validator)
+    return _draft_output(response_messages)
+
+
+def _completed_message():
+    return AIMessage(
         content="",
         tool_calls=[
             {
@@ -99,24 +125,41 @@ def revisor_node(state: State):
                 "type": "tool_call"
             }
         ]
-    )]}
-    user_intent = extract_last_tool_criteria(state)
-    revisor = Assistant(food_revision_runnable)
-    response_messages = revisor.respond(
-        {
-            "messages": [
-                generate_human_message(user_intent),
-            ] + filter_last_two_tool_messages(state)
-        }
     )
 
 
+def _revisor_input(state: State):
+    user_intent = extract_last_tool_criteria(state)
+    return {
+        "messages": [
+            generate_human_message(user_intent),
+        ] + filter_last_two_tool_messages(state)
+    }
+
+
+def revisor_node(state: State, config: RunnableConfig):
+    num_iterations = _get_num_iterations(state["messages"])
+    # Near the token budget the draft's verified suggestions are final: no reflection round.
+    if num_iterations > MAX_ITERATIONS or economy_mode(config):
+        print("@"*110)
+        return {"messages":[_completed_message()]}
+    response_messages = revisor.respond(_revisor_input(state), validator=food_revision_validator)
+
+
+    return {"messages": response_messages["messages"]}
+
+
+async def arevisor_node(state: State, config: RunnableConfig):
+    num_iterations = _get_num_iterations(state["messages"])
+    if num_iterations > MAX_ITERATIONS or economy_mode(config):
+        return {"messages":[_completed_message()]}
+    response_messages = await revisor.arespond(_revisor_input(state), validator=food_revision_validator)
     return {"messages": response_messages["messages"]}
 
 
 builder = StateGraph(State)
-builder.add_node("draft", draft_node)
-builder.add_node("revisor", revisor_node)
+builder.add_node("draft", RunnableCallable(draft_node, adraft_node))
+builder.add_node("revisor", RunnableCallable(revisor_node, arevisor_node))
 builder.add_node("execute_tools", tool_node)
 builder.add_edge("__start__", "draft")
 
@@ -1,21 +1,24 @@
 from langchain_core.prompts import ChatPromptTemplate
-from datetime import datetime
 from langchain_core.messages import ToolMessage, HumanMessage
 from langgraph.graph import StateGraph, START, END
+from langgraph.utils.runnable import RunnableCallable
 from utilities import create_tool_node_with_fallback
-from config import llm
-from langgraph.checkpoint.memory import MemorySaver
+from config import (
+    llm_for, CHECKPOINTER, CHECKPOINT_DB_PATH, CHECKPOINT_OPTIONS,
+    INTENT_ROUTER_ENABLED, INTENT_ROUTER_THRESHOLD, INTENT_ROUTER_MIN_MARGIN, INTENT_ROUTER_LOG_PATH,
+)
+from intent_router import IntentRouter, routed_by_intent_router
+from checkpointer import create_checkpointer
 from agents.doc_retrieval_agent import ToDocRetrieval
 from agents.order_management_agent import ToOrderManagement, order_management_sensitive_tools
 from agents.food_search_agent import ToFoodSearch
 from agents.food_suggestion_agent import ToSuggestionFood
-from agents.summarize_conversation_agent import summarize_conversation, should_summarize
-from graphs.part_1_graph import part_1_graph
+from agents.summarize_conversation_agent import summarize_conversation, asummarize_conversation, should_summarize
 from graphs.part_2_graph import part_2_graph
-from graphs.part_3_graph import part_3_graph
-from graphs.part_4_graph import part_4_graph
-from graphs.part_5_graph import part_5_graph
-from utilities import Assistant, State, create_entry_node
+from utilities import (
+    Assistant, State, LazySubgraph, create_entry_node, embed_text, find_tool_call, skipped_tool_messages,
+)
+from prompt_cache import CONTEXT_TEMPLATE, current_time
 from typing import Literal
 from tools import CompleteOrEscalate
 
@@ -29,16 +32,19 @@ def leave_skill(state: State) -> dict:
     to specific sub-graphs.
     """
     messages = []
-    if state["messages"][-1].tool_calls:
-        # Note: Doesn't currently handle the edge case where the llm performs parallel tool calls
+    message = state["messages"][-1]
+    if message.tool_calls:
+        # Calls made alongside CompleteOrEscalate are not run; they still get an answer.
+        tool_call = find_tool_call(message, CompleteOrEscalate.__name__) or message.tool_calls[0]
         messages.append(
             ToolMessage(
                 content="Resuming dialog with the host assistant. Please reflect on the past conversation and assist the user as needed.",
-                tool_call_id=state["messages"][-1].tool_calls[0]["id"],
+                tool_call_id=tool_call["id"],
                 name="leave_skill",
                 role="tool"
             )
         )
+        messages += skipped_tool_messages(message, tool_call["id"])
     return {
         "dialog_state": "pop",
         "messages": messages,
@@ -288,20 +294,19 @@ alway look at latest tool message for getting information, not entire history
 *** Never use 'ToOrderManagement' for searching foods! this is for only managing orders!***
 You cannot place order! so dont call 'ToOrderManagement' for searching food!
 
-
-📅 **Current Time:** {time}  
-📝 **Conversation Summary:**  {summary}
-
 """),
         ("placeholder", "{messages}"),
+        # Per-turn fields go last so the instructions and history above stay a byte-stable
+        # prefix for provider-side prompt caching.
+        ("system", CONTEXT_TEMPLATE),
     ]
-).partial(time=datetime.now())
+).partial(time=current_time)
 
 
 primary_assistant_tools = [
 
 ]
-assistant_runnable = primary_assistant_prompt | llm.bind_tools(
+assistant_runnable = primary_assistant_prompt | llm_for("primary_assistant").bind_tools(
     primary_assistant_tools
     + [
 ToDocRetrieval, ToOrderManagement, ToSuggestionFood
@@ -329,20 +334,30 @@ def route_primary_assistant(
     
     tool_calls = state["messages"][-1].tool_calls
     if tool_calls:
-        if tool_calls[0]["name"] == ToDocRetrieval.name:
-            return "enter_doc_retrieval"
-        if tool_calls[0]["name"] == ToOrderManagement.name:
-            return "enter_order_management"
-        if tool_calls[0]["name"] == ToFoodSearch.name:
-            return "enter_search_food"
-        if tool_calls[0]["name"] == ToSuggestionFood.name:
-            return "enter_suggestion_food"
+        # One assistant at a time: the first handoff wins, its entry node answers the rest.
+        handoffs = {
+            ToDocRetrieval.name: "enter_doc_retrieval",
+            ToOrderManagement.name: "enter_order_management",
+            ToFoodSearch.name: "enter_search_food",
+            ToSuggestionFood.name: "enter_suggestion_food",
+        }
+        for tool_call in tool_calls:
+            if tool_call["name"] in handoffs:
+                return handoffs[tool_call["name"]]
         
         return "primary_assistant_tools"
     return END
 
 
 
+def route_intent_router(
+    state: State,
+):
+    if routed_by_intent_router(state):
+        return route_primary_assistant(state)
+    return "primary_assistant"
+
+
 def route_management_assistant(
     state: State,
 ):  
@@ -365,12 +380,39 @@ builder.add_node("primary_assistant", Assistant(assistant_runnable))
 builder.add_node("fetch_user_info", user_info)
 builder.add_edge(START, "fetch_user_info")
 builder.add_node("leave_skill", leave_skill)
-builder.add_node("summarize_conversation", summarize_conversation)
-builder.add_edge("summarize_conversation", "primary_assistant")
-
-
-
-builder.add_node("doc_retrieval", part_1_graph)
+builder.add_node("summarize_conversation", RunnableCallable(summarize_conversation, asummarize_conversation))
+# Never reached by a turn: background summaries are written to the checkpoint "as" this node,
+# so the update schedules nothing and the next turn starts normally.
+builder.add_node("commit_summary", lambda state: {})
+builder.add_edge("commit_summary", END)
+
+# New user turns pass the local intent router first; it either emits the routing tool call
+# itself or hands the turn to primary_assistant unchanged.
+if INTENT_ROUTER_ENABLED:
+    first_responder = "intent_router"
+    intent_router = IntentRouter(
+        embed_text,
+        threshold=INTENT_ROUTER_THRESHOLD,
+        min_margin=INTENT_ROUTER_MIN_MARGIN,
+        log_path=INTENT_ROUTER_LOG_PATH,
+    )
+    builder.add_node("intent_router", RunnableCallable(intent_router, intent_router.acall))
+    builder.add_conditional_edges(
+        "intent_router",
+        route_intent_router,
+        ["primary_assistant", "enter_doc_retrieval", "enter_order_management", "enter_search_food",
+         "enter_suggestion_food"],
+    )
+else:
+    first_responder = "primary_assistant"
+builder.add_edge("summarize_conversation", first_responder)
+
+
+
+# The RAG, search and suggestion subgraphs are imported and compiled on first use, so a
+# fresh worker serves order traffic before lancedb, the embedder or Tavily are loaded.
+# Order management stays eager: it is light and relies on interrupt_before.
+builder.add_node("doc_retrieval", LazySubgraph("graphs.part_1_graph", "part_1_graph"))
 builder.add_node("order_management", part_2_graph)
 builder.add_node(
     "primary_assistant_tools", create_tool_node_with_fallback(primary_assistant_tools)
@@ -379,11 +421,11 @@ builder.add_node(
 # Doc retrieval assistant
 builder.add_node(
     "enter_doc_retrieval",
-    create_entry_node("Doc Retrieval Assistant", "doc_retrieval"),
+    create_entry_node("Doc Retrieval Assistant", "doc_retrieval", ToDocRetrieval.name),
 )
 builder.add_node(
     "enter_order_management",
-    create_entry_node("Order Management Assistant", "order_management"),
+    create_entry_node("Order Management Assistant", "order_management", ToOrderManagement.name),
 )
 builder.add_edge("enter_doc_retrieval", "doc_retrieval")
 builder.add_edge("enter_order_management", "order_management")
@@ -406,15 +448,19 @@ builder.add_conditional_edges("order_management",route_management_assistant, ["l
 
 # builder.add_edge("doc_retrieval", "leave_skill")
 
-builder.add_conditional_edges("fetch_user_info", should_summarize, ["primary_assistant", "summarize_conversation"])
+builder.add_conditional_edges(
+    "fetch_user_info",
+    should_summarize,
+    {"primary_assistant": first_responder, "summarize_conversation": "summarize_conversation"},
+)
 builder.add_edge("leave_skill", "primary_assistant")
 
 
-builder.add_node("search_food", part_3_graph)
+builder.add_node("search_food", LazySubgraph("graphs.part_3_graph", "part_3_graph"))
 
 builder.add_node(
     "enter_search_food",
-    create_entry_node("Search Food Assistant", "search_food"),
+    create_entry_node("Search Food Assistant", "search_food", ToFoodSearch.name),
 )
 builder.add_edge("enter_search_food", "search_food")
 builder.add_conditional_edges("search_food",route_management_assistant, ["leave_skill", END] )
@@ -426,17 +472,17 @@ builder.add_conditional_edges("search_food",route_management_assistant, ["leave_
 
 
 
-builder.add_node("suggest_food", part_5_graph)
+builder.add_node("suggest_food", LazySubgraph("graphs.part_5_graph", "part_5_graph"))
 
 builder.add_node(
     "enter_suggestion_food",
-    create_entry_node("Food Suggestion Assistant", "suggest_food"),
+    create_entry_node("Food Suggestion Assistant", "suggest_food", ToSuggestionFood.name),
 )
 builder.add_edge("enter_suggestion_food", "suggest_food")
 builder.add_conditional_edges("suggest_food",route_management_assistant, ["leave_skill", END] )
 
 
-memory = MemorySaver()
+memory = create_checkpointer(CHECKPOINTER, CHECKPOINT_DB_PATH, **CHECKPOINT_OPTIONS)
 supergraph = builder.compile(checkpointer=memory)
 
 # from IPython.display import Image, display
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+# An order id needs an explicit marker ("order id 42", "order #42"), or "order 42" with
+# nothing but punctuation or a filler word after it, so "order 2 pizzas" is not an id.
+ORDER_ID = re.compile(r"\border\s*(?:id|number|no\.?|#)\s*(?:is\s*)?:?\s*#?\s*(\d+)\b", re.IGNORECASE)
+BARE_ORDER_ID = re.compile(
+    r"\border\s+(\d+)\s*(?:$|[?.!,;:]|(?:please|status|is|was|has|yet|now)\b)", re.IGNORECASE
+)
+PHONE_NUMBER = re.compile(r"(\+?\d[\d\s-]{8,}\d)")
+STATUS_WORDS = re.compile(r"\b(status|where is|where's|track|tracking)\b", re.IGNORECASE)
+CANCEL_WORDS = re.compile(r"\bcancel(?:l?ed|l?ing)?\b", re.IGNORECASE)
+RESTAURANT = r"(?P<restaurant>[\w'’&-]+(?:\s+[\w'’&-]+){0,3}?)"
+MENU_PATTERNS = [
+    # "menu of/at/from Pizza Hut": (pattern, confidence)
+    (re.compile(rf"\bmenu\s+(?:of|at|from|for)\s+(?:the\s+)?{RESTAURANT}(?:\s+restaurant)?\s*[?.!]*$", re.IGNORECASE), 0.9),
+    # "show me Pizza Hut's menu"
+    (re.compile(
+        rf"^(?:(?:please\s+)?(?:show|give|send|get)\s+(?:me\s+)?)?(?:the\s+)?{RESTAURANT}(?:'s|’s)\s+menu\s*[?.!]*$",
+        re.IGNORECASE,
+    ), 0.9),
+    # "Pizza Hut menu": without a possessive the name may as well be a kind of menu ("kids
+    # menu"), so this stays below the default threshold and goes to primary_assistant.
+    (re.compile(
+        rf"^(?:(?:please\s+)?(?:show|give|send|get)\s+(?:me\s+)?)?(?:the\s+)?{RESTAURANT}(?:\s+restaurant)?\s+menu\s*[?.!]*$",
+        re.IGNORECASE,
+    ), 0.8),
+]
+# Words that never appear in a restaurant name captured above: verbs, pronouns, determiners
+# and kinds of menu ("can I see the menu", "what is on the dessert menu", "the kids menu").
+NOT_RESTAURANT = {
+    "a", "an", "the", "your", "my", "our", "their", "his", "her", "its", "this", "that", "these", "those",
+    "i", "me", "we", "you", "he", "she", "it", "they", "us", "them", "what", "which", "who", "where", "how",
+    "can", "could", "may", "might", "will", "would", "shall", "should", "do", "does", "did", "is", "are",
+    "was", "were", "be", "have", "has", "see", "show", "give", "send", "get", "want", "need", "like", "on",
+    "in", "of", "at", "to", "for", "from", "please", "full", "whole", "entire", "today", "todays", "today's",
+    "kids", "kid", "children", "childrens", "children's", "dessert", "desserts", "drink", "drinks", "wine",
+    "lunch", "dinner", "breakfast", "brunch", "vegan", "vegetarian", "special", "specials", "food", "new",
+}
+# Confidence of order rules: with an explicit id marker, and with the bare "order 42" form.
+ORDER_RULE_CONFIDENCE = 0.95
+BARE_ORDER_RULE_CONFIDENCE = 0.9
+
+
+def _restaurant(match) -> Optional[str]:
+    name = match.group("restaurant").strip()
+    words = re.findall(r"[\w'’&-]+", name.lower())
+    if not words or any(word in NOT_RESTAURANT for word in words):
+        return None
+    return name
+
+
+# Labelled utterances for the embedding classifier. Only "doc_retrieval" is routed from
+# the classifier alone (its tool call needs no extracted arguments); the other labels
+# are there so that chit-chat, cravings and order talk do not land on it by default.
+INTENT_EXAMPLES = {
+    "doc_retrieval": [
+        "what are the health benefits of olive oil?",
+        "how many calories are in an avocado?",
+        "can i drink tea right after my meal?",
+        "which vitamins are in spinach?",
+        "is brown rice healthier than white rice?",
+        "how should I store fresh fish?",
+        "how long should I boil an egg?",
+        "what foods are high in protein?",
+    ],
+    "order_management": [
+        "i want to see my order status",
+        "cancel my order",
+        "i want to comment on my order",
+        "where is my food?",
+    ],
+    "food_search": [
+        "do you have pizza?",
+        "is there any kebab available?",
+        "show me the menu",
+    ],
+    "food_suggestion": [
+        "i'm hungry, what should i eat?",
+        "suggest something spicy for dinner",
+        "recommend a cheap lunch",
+        "i want pizza",
+    ],
+    "chat": [
+        "hello",
+        "thanks!",
+        "who are you?",
+        "ok",
+    ],
+}
+
+
+def _last_turn(messages: list) -> tuple[Optional[str], Optional[AIMessage]]:
+    """The new user message, and the assistant message it answers (if any)."""
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        return None, None
+    previous = next((m for m in reversed(messages[:-1]) if isinstance(m, AIMessage)), None)
+    return messages[-1].content, previous
+
+
+class IntentRouter:
+    """
+    Routes self-evident user turns without a `primary_assistant` LLM call.
+
+    Rules handle requests whose tool arguments can be read off the text ("status of order
+    42", "show me X's menu"), each with a confidence for how unambiguous its pattern is;
+    a nearest-neighbour classifier over `INTENT_EXAMPLES` handles general food questions
+    for `ToDocRetrieval`. A decision at or above `threshold` becomes the routing tool call
+    `primary_assistant` would have made; anything else falls through to
+    `primary_assistant`. Every decision is appended to `log_path` as JSON lines so the
+    threshold can be tuned on real traffic.
+
+    Use it as `RunnableCallable(router, router.acall)`: the async path classifies in a
+    worker thread, so loading and running the embedding model never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], object],
+        threshold: float = 0.85,
+        min_margin: float = 0.05,
+        log_path: Optional[str] = None,
+    ):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.min_margin = min_margin
+        self.log_path = log_path
+        self._labels = None
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _examples(self):
+        with self._lock:
+            if self._matrix is None:
+                pairs = [(label, text) for label, texts in INTENT_EXAMPLES.items() for text in texts]
+                self._labels = [label for label, _ in pairs]
+                self._matrix = np.stack([self._embed(text) for _, text in pairs])
+            return self._labels, self._matrix
+
+    @staticmethod
+    def match_rules(text: str) -> Optional[tuple[str, dict, float]]:
+        """Return `(tool name, args, confidence)` for a rule match, else None."""
+        order, confidence = ORDER_ID.search(text), ORDER_RULE_CONFIDENCE
+        if not order:
+            order, confidence = BARE_ORDER_ID.search(text), BARE_ORDER_RULE_CONFIDENCE
+        if order:
+            order_id = int(order.group(1))
+            if CANCEL_WORDS.search(text):
+                phone = PHONE_NUMBER.search(text[:order.start()] + text[order.end():])
+                args = {"operation": "cancel_order", "order_id": order_id}
+                if phone:
+                    args["phone_number"] = re.sub(r"[\s-]", "", phone.group(1))
+                return "ToOrderManagement", args, confidence
+            if STATUS_WORDS.search(text):
+                return "ToOrderManagement", {"operation": "check_order_status", "order_id": order_id}, confidence
+        for pattern, confidence in MENU_PATTERNS:
+            menu = pattern.search(text.strip())
+            restaurant = _restaurant(menu) if menu else None
+            if restaurant:
+                return "ToFoodSearch", {"food_name": "", "restaurants_name": restaurant}, confidence
+        return None
+
+    def classify(self, text: str) -> tuple[str, float, float]:
+        """Nearest labelled example: `(label, similarity, margin over the best other label)`."""
+        labels, matrix = self._examples()
+        similarities = matrix @ self._embed(text)
+        best = int(np.argmax(similarities))
+        others = [s for label, s in zip(labels, similarities) if label != labels[best]]
+        margin = float(similarities[best] - max(others)) if others else 1.0
+        return labels[best], float(similarities[best]), margin
+
+    def decide(self, messages: list) -> Optional[dict]:
+        """The routing decision for the latest user turn, or None if it is not a fresh user turn."""
+        text, previous = _last_turn(messages)
+        if not text:
+            return None
+        rule = self.match_rules(text)
+        if rule:
+            # Rule matches face the same threshold as the classifier; weaker ones go to the LLM.
+            name, args, confidence = rule
+            return {"text": text, "tool": name, "args": args, "source": "rule", "confidence": confidence}
+
+        # A reply to the assistant's own question ("which restaurant?") only makes sense
+        # with the conversation, so it is left to primary_assistant.
+        if previous is not None and not previous.tool_calls and str(previous.content).rstrip().endswith("?"):
+            return {"text": text, "tool": None, "args": None, "source": "follow-up", "confidence": 0.0}
+
+        label, similarity, margin = self.classify(text)
+        decision = {"text": text, "tool": None, "args": None, "source": "classifier",
+                    "label": label, "confidence": similarity, "margin": margin}
+        if label == "doc_retrieval" and margin >= self.min_margin:
+            decision.update(tool="ToDocRetrieval", args={"user_query": text})
+        return decision
+
+    def _log(self, decision: dict, routed: bool, elapsed: float):
+        if not self.log_path:
+            return
+        record = {**decision, "routed": routed, "threshold": self.threshold,
+                  "elapsed_ms": round(elapsed * 1000, 2), "at": time.time()}
+        with self._lock, open(self.log_path, "a", encoding="utf-8") as log:
+            log.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def __call__(self, state: dict) -> dict:
+        start = time.perf_counter()
+        try:
+            decision = self.decide(state["messages"])
+        except Exception as e:
+            # The router is only a shortcut; any failure falls back to the LLM.
+            print(e)
+            return {}
+        return self._route(decision, start)
+
+    async def acall(self, state: dict) -> dict:
+        start = time.perf_counter()
+        try:
+            decision = await asyncio.to_thread(self.decide, state["messages"])
+        except Exception as e:
+            print(e)
+            return {}
+        return self._route(decision, start)
+
+    def _route(self, decision: Optional[dict], start: float) -> dict:
+        if decision is None:
+            return {}
+        routed = decision["tool"] is not None and decision["confidence"] >= self.threshold
+        self._log(decision, routed, time.perf_counter() - start)
+        if not routed:
+            return {}
+        tool_call = {"name": decision["tool"], "args": decision["args"], "id": f"call_{uuid.uuid4().hex[:24]}"}
+        message = AIMessage(
+            content="",
+            tool_calls=[tool_call],
+            response_metadata={"intent_router": {"source": decision["source"], "confidence": decision["confidence"]}},
+        )
+        return {"messages": [message]}
+
+
+def routed_by_intent_router(state: dict) -> bool:
+    """True if the router has just answered this turn with a routing tool call."""
+    last = state["messages"][-1]
+    return isinstance(last, AIMessage) and bool(last.tool_calls) and "intent_router" in last.response_metadata
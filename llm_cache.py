@@ -0,0 +1,112 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Optional, Sequence
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+import database
+
+
+CACHE_HIT = "llm_cache_hit"  # generation_info flag set on responses served from the cache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used_at);
+"""
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Local, disk-backed cache of chat model responses.
+
+    LangChain calls `lookup`/`update` with the serialized messages as `prompt` and an
+    `llm_string` holding the model name, its parameters and any bound tools and
+    `tool_choice`, so a hit needs a byte-identical request. Entries older than `ttl`
+    seconds are ignored and removed; past `max_entries` the least recently used go.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._eviction = database.LRUEviction("llm_cache", max_entries)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "saved_tokens": 0}
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = database.connect(self.path)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        connection = self._connection()
+        key = self._key(prompt, llm_string)
+        row = connection.execute("SELECT created_at, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self._count("misses")
+            return None
+        if self.ttl is not None and row[0] + self.ttl < now:
+            connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._count("expired")
+            self._count("misses")
+            return None
+        connection.execute("UPDATE llm_cache SET last_used_at = ? WHERE key = ?", (now, key))
+        generations = [loads(value) for value in json.loads(row[1])]
+        for generation in generations:
+            # Replayed usage_metadata is not new spend; tracing and the token ledger skip it.
+            generation.generation_info = {**(generation.generation_info or {}), CACHE_HIT: True}
+        self._count("hits")
+        self._count("saved_tokens", _total_tokens(generations))
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        connection = self._connection()
+        now = time.time()
+        value = json.dumps([dumps(generation) for generation in return_val])
+        connection.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, created_at, last_used_at, value) VALUES (?, ?, ?, ?)",
+            (self._key(prompt, llm_string), now, now, value),
+        )
+        self._evict(connection)
+
+    def _evict(self, connection):
+        evicted = self._eviction.after_write(connection)
+        if evicted:
+            self._count("evictions", evicted)
+
+    def clear(self, **kwargs: Any) -> None:
+        self._connection().execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        """Hit/miss counters since start-up, the hit ratio and tokens not re-sent to the provider."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {**self._stats, "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0}
+
+
+def _total_tokens(generations: Sequence) -> int:
+    total = 0
+    for generation in generations:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            total += usage.get("total_tokens", 0)
+    return total
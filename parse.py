@@ -1,4 +1,8 @@
 from dotenv import load_dotenv
+
+# Load environment variables (before config, which creates the OpenAI client)
+load_dotenv()
+
 from llama_parse import LlamaParse
 from llama_index.core import SimpleDirectoryReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -6,9 +10,9 @@ from langchain.docstore.document import Document
 import lancedb
 from lancedb.embeddings import get_registry
 from lancedb.pydantic import LanceModel, Vector
-
-# Load environment variables
-load_dotenv()
+from config import EMBEDDING_BACKEND
+# Registers the "sentence-transformers-backend" embedding function used below.
+import embeddings
 
 # Constants
 PDF_FILE_PATH = './The New Complete Book of Foos.pdf'
@@ -34,9 +38,11 @@ def split_documents(documents, chunk_size, chunk_overlap):
             source_chunks.append(Document(page_content=chunk, metadata=source.metadata))
     return source_chunks
 
-def initialize_embedder(model_name):
-    """Initialize the embedding model."""
-    return get_registry().get("sentence-transformers").create(name=model_name)
+def initialize_embedder(model_name, backend=EMBEDDING_BACKEND):
+    """Initialize the embedding model on the configured backend (see embeddings.py)."""
+    if backend == "torch":
+        return get_registry().get("sentence-transformers").create(name=model_name)
+    return get_registry().get("sentence-transformers-backend").create(name=model_name, backend=backend)
 
 def prepare_data(source_chunks):
     """Prepare data for LanceDB."""
@@ -0,0 +1,132 @@
+import json
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, convert_to_openai_messages
+
+
+# Trailing system message for the per-turn fields. Keeping them out of the instruction
+# block lets the provider reuse its cached prefix (instructions + history) on every turn.
+CONTEXT_TEMPLATE = """📅 **Current Time:** {time}
+📝 **Conversation Summary:**  {summary}"""
+
+MAX_TRACKED_PROMPTS = 1024
+MAX_COUNTED_MESSAGES = 8192
+
+_encode = None
+_message_tokens = OrderedDict()  # (id, content length, tool calls) -> tokens
+_count_lock = threading.Lock()
+
+
+def current_time() -> str:
+    """Evaluated on every prompt render, unlike a value bound once at import."""
+    return datetime.now().isoformat(sep=" ", timespec="minutes")
+
+
+def _load_encoder():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base").encode
+    except Exception:
+        # Offline or no tiktoken: one token per word or punctuation mark. Whitespace mostly
+        # merges into the next word's token, so it is not counted on its own.
+        return lambda text: re.findall(r"\w+|[^\w\s]", text)
+
+
+def render_prompt(messages: list[BaseMessage]) -> str:
+    """The chat messages as the provider receives them, one JSON object per line."""
+    return "\n".join(
+        json.dumps(message, ensure_ascii=False, sort_keys=True)
+        for message in convert_to_openai_messages(messages)
+    )
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Tokens `message` adds to a prompt, counted once per message and cached."""
+    global _encode
+    key = (message.id, len(str(message.content)), len(getattr(message, "tool_calls", None) or ()))
+    with _count_lock:
+        if key[0] is not None and key in _message_tokens:
+            _message_tokens.move_to_end(key)
+            return _message_tokens[key]
+        if _encode is None:
+            _encode = _load_encoder()
+    tokens = len(_encode(render_prompt([message])))
+    if key[0] is not None:
+        with _count_lock:
+            _message_tokens[key] = tokens
+            if len(_message_tokens) > MAX_COUNTED_MESSAGES:
+                _message_tokens.popitem(last=False)
+    return tokens
+
+
+def history_tokens(messages: list[BaseMessage]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+
+def common_prefix_length(previous: list, current: list) -> int:
+    length = 0
+    for a, b in zip(previous, current):
+        if a != b:
+            break
+        length += 1
+    return length
+
+
+class PrefixStabilityTracker(BaseCallbackHandler):
+    """
+    Callback that measures how much of each node's prompt is identical to its previous call.
+
+    For every chat model call it tokenizes the rendered messages and compares them with the
+    last prompt the same graph node sent on the same thread. The count of equal leading
+    tokens is the most a provider prefix cache can reuse; `report()` aggregates it per node.
+    """
+
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+        self._encode = _load_encoder()
+        self._last = OrderedDict()  # (node, thread_id) -> tokens of the last prompt
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"calls": 0, "compared": 0, "stable_tokens": 0, "prompt_tokens": 0})
+
+    def on_chat_model_start(self, serialized: dict, messages: list[list[BaseMessage]], *, metadata: dict = None, **kwargs: Any):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node", "unknown")
+        key = (node, metadata.get("thread_id"))
+        tokens = self._encode(render_prompt(messages[0]))
+
+        with self._lock:
+            previous = self._last.pop(key, None)
+            self._last[key] = tokens
+            if len(self._last) > MAX_TRACKED_PROMPTS:
+                self._last.popitem(last=False)
+            stats = self._stats[node]
+            stats["calls"] += 1
+            if previous is None:
+                return
+            stable = common_prefix_length(previous, tokens)
+            stats["compared"] += 1
+            stats["stable_tokens"] += stable
+            stats["prompt_tokens"] += len(tokens)
+            stats["last_stable_tokens"] = stable
+            stats["last_prompt_tokens"] = len(tokens)
+
+        if self.verbose:
+            print(f"[prefix] {node}: {stable}/{len(tokens)} leading tokens unchanged since last turn")
+
+    def report(self) -> dict:
+        """Per node: calls, turns compared, average stable prefix and its share of the prompt."""
+        with self._lock:
+            report = {}
+            for node, stats in self._stats.items():
+                compared = stats["compared"]
+                report[node] = {
+                    **stats,
+                    "avg_stable_tokens": stats["stable_tokens"] / compared if compared else 0.0,
+                    "stable_ratio": stats["stable_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0,
+                }
+            return report
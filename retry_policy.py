@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+from langchain_core.runnables import Runnable, RunnableBinding, RunnableConfig, RunnableSequence
+from config import ASSISTANT_MAX_RETRIES, ASSISTANT_RETRY_BACKOFF, ASSISTANT_RETRY_BACKOFF_MAX, ASSISTANT_RETRY_DEADLINE
+
+
+RETRY, OUT_OF_RETRIES, DEADLINE, BUDGET = "retried", "out_of_retries", "deadline", "over_budget"
+
+_lock = threading.Lock()
+_stats = defaultdict(int)  # (node, reason, outcome) -> count
+
+
+class RetryPolicy:
+    """
+    How often, how soon and until when a node asks the model again after an unusable answer.
+
+    Retry n waits `backoff * 2 ** (n - 1)` seconds, capped at `max_backoff`. No retry is
+    started past `max_retries`, or if its wait would end later than `deadline` seconds after
+    the node's first call (None: no deadline).
+    """
+
+    def __init__(self, max_retries: int = 1, backoff: float = 0.5, max_backoff: float = 4.0, deadline: Optional[float] = None):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+
+    def decide(self, retry: int, started: float) -> tuple[str, float]:
+        """`("retried", delay)` if retry number `retry` may run, else `("out_of_retries"|"deadline", 0)`."""
+        if retry > self.max_retries:
+            return OUT_OF_RETRIES, 0.0
+        delay = min(self.max_backoff, self.backoff * 2 ** (retry - 1))
+        if self.deadline is not None and time.perf_counter() - started + delay >= self.deadline:
+            return DEADLINE, 0.0
+        return RETRY, delay
+
+
+default_policy = RetryPolicy(
+    max_retries=ASSISTANT_MAX_RETRIES,
+    backoff=ASSISTANT_RETRY_BACKOFF,
+    max_backoff=ASSISTANT_RETRY_BACKOFF_MAX,
+    deadline=ASSISTANT_RETRY_DEADLINE,
+)
+
+
+def force_tool_choice(runnable: Runnable) -> Optional[Runnable]:
+    """
+    `prompt | llm.bind_tools(tools)` with `tool_choice="required"`, so the model must call
+    one of its tools; None if `runnable` does not end in a tool-bound model.
+    """
+    if isinstance(runnable, RunnableSequence):
+        last = runnable.last
+        if isinstance(last, RunnableBinding) and last.kwargs.get("tools"):
+            return RunnableSequence(*runnable.steps[:-1], last.bind(tool_choice="required"))
+    return None
+
+
+def node_name(config: Optional[RunnableConfig]) -> str:
+    return ((config or {}).get("metadata") or {}).get("langgraph_node", "unknown")
+
+
+def record(node: str, reason: str, outcome: str):
+    with _lock:
+        _stats[(node, reason, outcome)] += 1
+
+
+def retry_stats() -> dict:
+    """`{node: {reason: {outcome: count}}}`; outcome is retried, out_of_retries, deadline or over_budget."""
+    with _lock:
+        stats = {}
+        for (node, reason, outcome), count in _stats.items():
+            stats.setdefault(node, {}).setdefault(reason, {})[outcome] = count
+        return stats
+
+
+def prometheus() -> str:
+    with _lock:
+        lines = [
+            "# HELP foodbot_assistant_retries_total Unusable model answers per node, by reason and what followed.",
+            "# TYPE foodbot_assistant_retries_total counter",
+        ]
+        lines += [
+            f'foodbot_assistant_retries_total{{node="{node}",reason="{reason}",outcome="{outcome}"}} {count}'
+            for (node, reason, outcome), count in _stats.items()
+        ]
+        return "\n".join(lines) + "\n"
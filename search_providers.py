@@ -0,0 +1,119 @@
+import asyncio
+import json
+import re
+import time
+from typing import Any, Optional, Type
+from langchain_core.tools import BaseTool
+from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_community.tools.tavily_search.tool import TavilyInput
+from pydantic import BaseModel
+from config import (
+    WEB_SEARCH_PROVIDER, WEB_SEARCH_LOCAL_PATH, WEB_SEARCH_LOCAL_LATENCY,
+    WEB_SEARCH_CACHE_ENABLED, WEB_SEARCH_CACHE_PATH, WEB_SEARCH_CACHE_TTL, WEB_SEARCH_CACHE_MAX_ENTRIES,
+)
+from web_search_cache import WebSearchCache
+
+
+cache = (
+    WebSearchCache(WEB_SEARCH_CACHE_PATH, ttl=WEB_SEARCH_CACHE_TTL, max_entries=WEB_SEARCH_CACHE_MAX_ENTRIES)
+    if WEB_SEARCH_CACHE_ENABLED else None
+)
+
+
+def _terms(text: str) -> set[str]:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+class LocalSearchResults(BaseTool):
+    """
+    Offline stand-in for `TavilySearchResults`, for tests and development.
+
+    It has the same name, input schema and `(results, raw)` output, so agents and prompts
+    are unaware of the swap. Results come from a JSON file holding a list of
+    `{"url": ..., "content": ...}` documents, ranked by how many query terms they share;
+    `latency` seconds are slept per call to mimic a network round-trip.
+    """
+
+    name: str = "tavily_search_results_json"
+    description: str = (
+        "A search engine optimized for comprehensive, accurate, and trusted results. "
+        "Useful for when you need to answer questions about current events. "
+        "Input should be a search query."
+    )
+    args_schema: Type[BaseModel] = TavilyInput
+    response_format: str = "content_and_artifact"
+    max_results: int = 5
+    path: Optional[str] = None
+    latency: float = 0.0
+    documents: list = []
+
+    def model_post_init(self, __context):
+        if self.path and not self.documents:
+            with open(self.path, encoding="utf-8") as f:
+                self.documents = json.load(f)
+
+    def _search(self, query: str) -> list[dict]:
+        terms = _terms(query)
+        scored = []
+        for document in self.documents:
+            overlap = len(terms & _terms(document.get("content", "")))
+            if overlap:
+                scored.append((overlap, document))
+        scored.sort(key=lambda pair: -pair[0])
+        return [{"url": d.get("url", ""), "content": d.get("content", "")} for _, d in scored[:self.max_results]]
+
+    def _run(self, query: str, run_manager=None):
+        if self.latency:
+            time.sleep(self.latency)
+        results = self._search(query)
+        return results, {"query": query, "results": results}
+
+    async def _arun(self, query: str, run_manager=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        results = self._search(query)
+        return results, {"query": query, "results": results}
+
+
+class CachedSearchResults(BaseTool):
+    """
+    A search tool answered from `cache` when possible.
+
+    Same name, input schema and `(results, raw)` output as the wrapped `search` tool; only
+    misses reach it, and concurrent identical queries share one call.
+    """
+
+    name: str = "tavily_search_results_json"
+    description: str = ""
+    args_schema: Type[BaseModel] = TavilyInput
+    response_format: str = "content_and_artifact"
+    search: BaseTool
+    cache: Any
+    namespace: str
+
+    def _run(self, query: str, run_manager=None):
+        return self.cache.search(self.namespace, query, lambda: self.search._run(query))
+
+    async def _arun(self, query: str, run_manager=None):
+        return await self.cache.asearch(self.namespace, query, lambda: self.search._arun(query))
+
+
+def web_search_tool(max_results: int = 3) -> BaseTool:
+    """
+    The configured web search tool: Tavily, or the local stand-in when WEB_SEARCH_PROVIDER=local,
+    behind the shared result cache unless WEB_SEARCH_CACHE_ENABLED is off.
+    """
+    if WEB_SEARCH_PROVIDER == "local":
+        search = LocalSearchResults(max_results=max_results, path=WEB_SEARCH_LOCAL_PATH, latency=WEB_SEARCH_LOCAL_LATENCY)
+    else:
+        search = TavilySearchResults(max_results=max_results)
+    if cache is None:
+        return search
+    return CachedSearchResults(
+        name=search.name,
+        description=search.description,
+        args_schema=search.args_schema,
+        search=search,
+        cache=cache,
+        namespace=f"{WEB_SEARCH_PROVIDER}:{max_results}",
+    )
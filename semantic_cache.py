@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class SemanticCache:
+    """
+    Result cache keyed by query meaning rather than query text.
+
+    A lookup first tries the normalized query text, then embeds the query and returns
+    the results of the most similar cached query whose cosine similarity is at least
+    `threshold`. Entries are tied to the source version reported by `version_fn`; when
+    it changes the whole cache is dropped. At most `max_entries` queries are kept,
+    least recently used first out.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Any],
+        version_fn: Callable[[], Hashable] = lambda: None,
+        threshold: float = 0.92,
+        max_entries: int = 512,
+    ):
+        self.embed_fn = embed_fn
+        self.version_fn = version_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # normalized query -> (unit vector, results)
+        self._matrix = None
+        self._keys = []
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self):
+        version = self.version_fn()
+        if version != self._version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _rebuild_matrix(self):
+        self._keys = list(self._entries)
+        self._matrix = np.stack([self._entries[key][0] for key in self._keys]) if self._keys else None
+
+    def get(self, query: str) -> tuple[Optional[Any], Optional[np.ndarray]]:
+        """
+        Return `(results, None)` on a hit, or `(None, vector)` on a miss.
+
+        The query vector is handed back on a miss so `put` does not embed it twice.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key][1], None
+
+        vector = self._embed(query)
+        with self._lock:
+            if self._matrix is None and self._entries:
+                self._rebuild_matrix()
+            if self._matrix is not None:
+                similarities = self._matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold and self._keys[best] in self._entries:
+                    self._entries.move_to_end(self._keys[best])
+                    self._stats["hits"] += 1
+                    self._stats["semantic_hits"] += 1
+                    return self._entries[self._keys[best]][1], None
+            self._stats["misses"] += 1
+        return None, vector
+
+    def peek(self, query: str) -> Optional[Any]:
+        """The results cached for this exact (normalized) query, without embedding it or counting a lookup."""
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            return entry[1] if entry else None
+
+    def put(self, query: str, results: Any, vector: Optional[np.ndarray] = None):
+        if vector is None:
+            vector = self._embed(query)
+        with self._lock:
+            self._check_version()
+            self._entries[normalize_query(query)] = (vector, results)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
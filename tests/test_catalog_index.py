@@ -0,0 +1,126 @@
+import random
+import shutil
+import sqlite3
+import pytest
+import database
+from catalog_index import FieldIndex, FoodCatalogIndex, bounded_distance, get_catalog_index, reset_catalog_index
+
+Levenshtein = pytest.importorskip("Levenshtein")
+
+ROWS_QUERY = "SELECT id, food_name, food_category, restaurant_name, price FROM foods"
+
+
+def scan_distance(query: str, value: str) -> int:
+    """The distance of the full-table scan the index replaced."""
+    query, value = query.lower(), value.lower()
+    return min(Levenshtein.distance(query, value, weights=weights) for weights in ((0, 1, 1), (1, 0, 1), (1, 1, 1)))
+
+
+def scan_search(rows, food_name=None, restaurant_name=None, max_distance=1):
+    """The full-table scan `available_food_search` used before the catalog index."""
+    matches = []
+    for food_id, db_food_name, food_category, db_restaurant_name, db_price in rows:
+        distances = []
+        if food_name:
+            distances.append(scan_distance(food_name, db_food_name))
+        if restaurant_name:
+            distances.append(scan_distance(restaurant_name, db_restaurant_name))
+        if distances and max(distances) <= max_distance:
+            matches.append({
+                'id': food_id,
+                'food_name': db_food_name,
+                'food_category': food_category,
+                'restaurant_name': db_restaurant_name,
+                'price': db_price,
+                'edit_distance': min(distances),
+            })
+    matches.sort(key=lambda x: x['edit_distance'])
+    return matches
+
+
+def typo(text: str, rng: random.Random) -> str:
+    if not text:
+        return text
+    i = rng.randrange(len(text))
+    kind = rng.choice(("substitute", "delete", "insert", "transpose"))
+    if kind == "substitute":
+        return text[:i] + rng.choice("aeiourst") + text[i + 1:]
+    if kind == "insert":
+        return text[:i] + rng.choice("aeiourst") + text[i:]
+    if kind == "transpose" and i < len(text) - 1:
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    return text[:i] + text[i + 1:]
+
+
+@pytest.fixture
+def catalog_db(tmp_path):
+    path = tmp_path / "food_orders.db"
+    shutil.copy("food_orders.db", path)
+    previous = database.DB_PATH
+    database.configure(str(path))
+    reset_catalog_index()
+    yield str(path)
+    reset_catalog_index()
+    database.configure(previous)
+
+
+@pytest.fixture(scope="module")
+def rows():
+    connection = sqlite3.connect("food_orders.db")
+    try:
+        return connection.execute(ROWS_QUERY).fetchall()
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2])
+def test_bounded_distance_matches_weighted_levenshtein(max_distance):
+    rng = random.Random(max_distance)
+    for _ in range(5000):
+        a = "".join(rng.choice("abcde ") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("abcde ") for _ in range(rng.randint(0, 8)))
+        expected = scan_distance(a, b)
+        assert bounded_distance(a, b, max_distance) == (expected if expected <= max_distance else None), (a, b)
+
+
+@pytest.mark.parametrize("max_distance", [1, 2])
+def test_field_index_finds_every_value_the_scan_finds(max_distance):
+    rng = random.Random(7)
+    values = sorted({"".join(rng.choice("abcdefg ") for _ in range(rng.randint(1, 10))) for _ in range(400)})
+    index = FieldIndex(values)
+    for _ in range(500):
+        query = typo(typo(rng.choice(values), rng), rng) if rng.random() < 0.8 else "".join(
+            rng.choice("abcdefgxyz") for _ in range(rng.randint(1, 6)))
+        expected = {value_id: distance for value_id, value in enumerate(values)
+                    if (distance := scan_distance(query, value)) <= max_distance}
+        assert index.search(query, max_distance) == expected, query
+
+
+def test_catalog_search_matches_full_scan(rows):
+    index = FoodCatalogIndex(rows)
+    rng = random.Random(11)
+    food_names = sorted({row[1] for row in rows})
+    restaurant_names = sorted({row[3] for row in rows})
+    for _ in range(300):
+        food_name = typo(rng.choice(food_names), rng) if rng.random() < 0.7 else None
+        restaurant_name = typo(rng.choice(restaurant_names), rng) if rng.random() < 0.5 or not food_name else None
+        assert index.search(food_name, restaurant_name) == scan_search(rows, food_name, restaurant_name), (
+            food_name, restaurant_name)
+
+
+def test_index_is_rebuilt_after_catalog_edits(catalog_db):
+    assert get_catalog_index().search("Zzyzx Wrap") == []
+    first = get_catalog_index()
+    assert get_catalog_index() is first
+
+    # Written by another connection, as an admin script or another worker would.
+    connection = sqlite3.connect(catalog_db)
+    with connection:
+        connection.execute(
+            "INSERT INTO foods (food_name, food_category, restaurant_name, price) VALUES (?, ?, ?, ?)",
+            ("Zzyzx Wrap", "fast_food", "Test Kitchen", 5.0),
+        )
+    connection.close()
+
+    assert [match["food_name"] for match in get_catalog_index().search("Zzyzx Wrap")] == ["Zzyzx Wrap"]
+    assert get_catalog_index() is not first
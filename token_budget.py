@@ -0,0 +1,206 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional
+from langchain_core.runnables import RunnableConfig
+import database
+from config import (
+    TOKEN_ACCOUNTING_ENABLED, TOKEN_LEDGER_PATH, TOKEN_BUDGET_PER_TURN, TOKEN_BUDGET_PER_THREAD,
+    TOKEN_BUDGET_SOFT_RATIO,
+)
+from tracing import BackgroundWriter, tracer
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_usage (
+    thread_id TEXT NOT NULL,
+    node TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, node)
+);
+"""
+KINDS = ("prompt_tokens", "completion_tokens", "cached_tokens")
+MAX_TRACKED_THREADS = 4096
+OK, LOW, EXHAUSTED = "ok", "low", "exhausted"
+
+
+def _spent(usage: dict) -> int:
+    # Cached prompt tokens are part of prompt_tokens; they are reported, not counted twice.
+    return usage["prompt_tokens"] + usage["completion_tokens"]
+
+
+class TokenLedger:
+    """
+    Tokens spent per conversation, per node, with per-turn and per-thread budgets.
+
+    It is fed the node records of `tracing.NodeTracer`, so it sees the same usage the traces
+    report. Per-thread totals are kept in SQLite (shared by every worker on the box, like
+    the sqlite checkpointer), written by a background thread; running totals and the
+    current turn's total are kept in memory. A budget of 0 is unlimited. `status()` is
+    "low" from `soft_ratio` of either budget and "exhausted" past it.
+    """
+
+    def __init__(self, path: str, per_turn: int = 0, per_thread: int = 0, soft_ratio: float = 0.8):
+        self.path = path
+        self.per_turn = per_turn
+        self.per_thread = per_thread
+        self.soft_ratio = soft_ratio
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._threads = OrderedDict()  # thread_id -> spent tokens, loaded from the table on first use
+        self._turns = OrderedDict()    # thread_id -> (turn id, spent tokens)
+        self._node_totals = defaultdict(lambda: dict.fromkeys(KINDS, 0))
+        self._statuses = dict.fromkeys((OK, LOW, EXHAUSTED), 0)
+        self._connection().executescript(SCHEMA)
+        self._writer = BackgroundWriter(self._write, name="token-ledger-writer")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = database.connect(self.path)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > MAX_TRACKED_THREADS:
+            cache.popitem(last=False)
+
+    def _thread_spent(self, thread_id: str) -> int:
+        spent = self._threads.get(thread_id)
+        if spent is None:
+            row = self._connection().execute(
+                "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM token_usage WHERE thread_id = ?",
+                (thread_id,),
+            ).fetchone()
+            spent = row[0]
+            self._remember(self._threads, thread_id, spent)
+        return spent
+
+    def record(self, record: dict):
+        """Add a node record (from `NodeTracer`) to its thread's totals."""
+        thread_id = record.get("thread_id")
+        usage = {kind: record.get(kind, 0) for kind in KINDS}
+        if not thread_id or not any(usage.values()):
+            return
+        spent = _spent(usage)
+        with self._lock:
+            # Load the stored total before this record is queued, so it is counted once.
+            self._remember(self._threads, thread_id, self._thread_spent(thread_id) + spent)
+            # Records without a turn (background summaries) leave the running turn's total alone.
+            if record.get("turn") is not None:
+                turn, turn_spent = self._turns.get(thread_id, (None, 0))
+                if turn != record["turn"]:
+                    turn, turn_spent = record["turn"], 0
+                self._remember(self._turns, thread_id, (turn, turn_spent + spent))
+            for kind, value in usage.items():
+                self._node_totals[record["node"]][kind] += value
+        self._writer.put((thread_id, record["node"], record.get("llm_calls", 0), *usage.values(), time.time()))
+
+    def _write(self, rows: list[tuple]):
+        connection = self._connection()
+        # One transaction per batch instead of one commit per record.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                """
+                INSERT INTO token_usage (thread_id, node, calls, prompt_tokens, completion_tokens, cached_tokens, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (thread_id, node) DO UPDATE SET
+                    calls = calls + excluded.calls,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    completion_tokens = completion_tokens + excluded.completion_tokens,
+                    cached_tokens = cached_tokens + excluded.cached_tokens,
+                    updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+        except BaseException:
+            connection.rollback()
+            raise
+        else:
+            connection.commit()
+
+    def _turn_spent(self, thread_id: str, turn: Optional[str]) -> int:
+        # A new turn starts from 0 even before its first record arrives.
+        recorded, spent = self._turns.get(thread_id, (None, 0))
+        return spent if turn is not None and recorded == turn else 0
+
+    def usage(self, thread_id: str, turn: Optional[str] = None) -> dict:
+        """The thread's tokens per node (as written so far), its total and `turn`'s total."""
+        rows = self._connection().execute(
+            "SELECT node, calls, prompt_tokens, completion_tokens, cached_tokens FROM token_usage WHERE thread_id = ?",
+            (thread_id,),
+        ).fetchall()
+        nodes = {
+            node: {"calls": calls, "prompt_tokens": prompt, "completion_tokens": completion, "cached_tokens": cached}
+            for node, calls, prompt, completion, cached in rows
+        }
+        with self._lock:
+            turn_spent = self._turn_spent(thread_id, turn)
+            thread_spent = self._thread_spent(thread_id)
+        return {
+            "nodes": nodes,
+            "thread_tokens": thread_spent,
+            "turn_tokens": turn_spent,
+            "status": self.status(thread_id, turn),
+        }
+
+    def status(self, thread_id: Optional[str], turn: Optional[str] = None) -> str:
+        """Budget state of the thread, with the turn budget applied to `turn` (the current run)."""
+        if not thread_id:
+            return OK
+        with self._lock:
+            turn_spent = self._turn_spent(thread_id, turn)
+            thread_spent = self._thread_spent(thread_id)
+            ratio = max(
+                turn_spent / self.per_turn if self.per_turn else 0.0,
+                thread_spent / self.per_thread if self.per_thread else 0.0,
+            )
+            status = EXHAUSTED if ratio >= 1 else LOW if ratio >= self.soft_ratio else OK
+            self._statuses[status] += 1
+            return status
+
+    def prometheus(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP foodbot_tokens_total Tokens spent per graph node, by kind.",
+                "# TYPE foodbot_tokens_total counter",
+            ]
+            for node, totals in self._node_totals.items():
+                lines += [f'foodbot_tokens_total{{node="{node}",kind="{kind}"}} {value}' for kind, value in totals.items()]
+            lines += [
+                "# HELP foodbot_token_budget_checks_total Budget checks made by the graph, by outcome.",
+                "# TYPE foodbot_token_budget_checks_total counter",
+            ]
+            lines += [f'foodbot_token_budget_checks_total{{status="{status}"}} {count}' for status, count in self._statuses.items()]
+            return "\n".join(lines) + "\n"
+
+
+ledger = None
+if TOKEN_ACCOUNTING_ENABLED and tracer is not None:
+    ledger = TokenLedger(
+        TOKEN_LEDGER_PATH,
+        per_turn=TOKEN_BUDGET_PER_TURN,
+        per_thread=TOKEN_BUDGET_PER_THREAD,
+        soft_ratio=TOKEN_BUDGET_SOFT_RATIO,
+    )
+    tracer.listeners.append(ledger.record)
+
+
+def budget_status(config: Optional[RunnableConfig]) -> str:
+    """Budget state of the thread in `config`: "ok", "low" or "exhausted" ("ok" without a ledger)."""
+    if ledger is None or not config:
+        return OK
+    return ledger.status(config.get("configurable", {}).get("thread_id"), tracer.turn_of(config))
+
+
+def economy_mode(config: Optional[RunnableConfig]) -> bool:
+    """True once the thread or turn is near its token budget; nodes then take their cheaper path."""
+    return budget_status(config) != OK
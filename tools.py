@@ -1,11 +1,13 @@
-import sqlite3
-import Levenshtein
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import database
 from langchain_core.tools import tool
-from utilities import document_search
+from utilities import document_search, adocument_search, get_doc_store
+from config import SPECULATIVE_WEB_SEARCH, SPECULATIVE_WEB_MIN_SCORE
+from catalog_index import get_catalog_index
 from pydantic import BaseModel
 
-# atexit.register(lambda: connection.close())
-
 @tool
 def retrieve_from_doc(query: str) -> list[str]:
     """
@@ -29,12 +31,121 @@ def retrieve_from_doc(query: str) -> list[str]:
     Returns:
         list[str]: A list of matching texts from the database or ["NO RESULT!"] if no relevant matches are found.
     """
+    if SPECULATIVE_WEB_SEARCH:
+        return _speculative_retrieve(query)
     result = document_search(query)
     if len(result) > 0:
         return [item['text'] for item in result]
     return ["NO RESULT!"]
 
 
+async def _aretrieve_from_doc(query: str) -> list[str]:
+    if SPECULATIVE_WEB_SEARCH:
+        return await _aspeculative_retrieve(query)
+    result = await adocument_search(query)
+    if len(result) > 0:
+        return [item['text'] for item in result]
+    return ["NO RESULT!"]
+
+# Same tool schema; ToolNode awaits this when the graph runs asynchronously.
+retrieve_from_doc.coroutine = _aretrieve_from_doc
+
+
+# Speculative web search: the web lookup runs alongside document_search so questions the
+# book cannot answer do not pay for the local chain and the web chain back to back.
+_speculation_lock = threading.Lock()
+_speculation = {"web_tool": None, "pool": None}
+# skipped: local results were already cached and strong; errors: the web lookup failed.
+speculation_stats = {"started": 0, "used": 0, "discarded": 0, "skipped": 0, "errors": 0}
+
+
+def _speculation_resources():
+    with _speculation_lock:
+        if _speculation["web_tool"] is None:
+            from search_providers import web_search_tool
+
+            _speculation["web_tool"] = web_search_tool(max_results=3)
+            _speculation["pool"] = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-web")
+        speculation_stats["started"] += 1
+        return _speculation["web_tool"], _speculation["pool"]
+
+
+def _local_is_weak(result) -> bool:
+    if isinstance(result, str) or not result:
+        return True
+    return max(item["_relevance_score"] for item in result) < SPECULATIVE_WEB_MIN_SCORE
+
+
+def _known_strong(query: str) -> bool:
+    """True if this exact query's local results are cached and strong, so no lookup is needed."""
+    try:
+        cached = get_doc_store()["cache"].peek(query)
+    except Exception as e:
+        print(e)
+        return False
+    return cached is not None and not _local_is_weak(cached)
+
+
+def _count(name: str):
+    with _speculation_lock:
+        speculation_stats[name] += 1
+
+
+def _merge_results(result, web_results) -> list[str]:
+    texts = [] if isinstance(result, str) else [item['text'] for item in result]
+    if isinstance(web_results, list):
+        # Labelled so the grader can tell the two sources apart.
+        texts += [f"[web] {item.get('url', '')}\n{item.get('content', '')}" for item in web_results]
+    return texts or ["NO RESULT!"]
+
+
+def _web_outcome(web_results):
+    # Failed lookups raise or come back as an error string; neither reaches the grader.
+    _count("used" if isinstance(web_results, list) else "errors")
+
+
+def _speculative_retrieve(query: str) -> list[str]:
+    if _known_strong(query):
+        _count("skipped")
+        return _merge_results(document_search(query), None)
+    web_tool, pool = _speculation_resources()
+    web = pool.submit(web_tool.invoke, {"query": query})
+    result = document_search(query)
+    if not _local_is_weak(result):
+        # Strong local hits: drop the speculative lookup. cancel() only stops a lookup still
+        # queued in the pool; one already running finishes (and is paid for) regardless.
+        web.cancel()
+        _count("discarded")
+        return _merge_results(result, None)
+    try:
+        web_results = web.result()
+    except Exception as e:
+        print(e)
+        web_results = None
+    _web_outcome(web_results)
+    return _merge_results(result, web_results)
+
+
+async def _aspeculative_retrieve(query: str) -> list[str]:
+    if _known_strong(query):
+        _count("skipped")
+        return _merge_results(await adocument_search(query), None)
+    web_tool, _ = _speculation_resources()
+    web = asyncio.ensure_future(web_tool.ainvoke({"query": query}))
+    result = await adocument_search(query)
+    if not _local_is_weak(result):
+        web.cancel()
+        _count("discarded")
+        return _merge_results(result, None)
+    try:
+        web_results = await web
+    except Exception as e:
+        print(e)
+        web_results = None
+    _web_outcome(web_results)
+    return _merge_results(result, web_results)
+
+
 
 @tool
 def available_food_search(
@@ -50,66 +161,7 @@ def available_food_search(
     Returns:
         list[str]: A list of available foods.
     """
-    max_distance = 1
-    connection = sqlite3.connect('food_orders.db')
-
-    cursor = connection.cursor()
-    cursor.execute("SELECT id, food_name, food_category, restaurant_name, price FROM foods")
-    results = cursor.fetchall()
-
-    matches = []
-    for food_id, db_food_name, food_category, db_restaurant_name, db_price in results:
-        food_name_distance = float('inf')
-        restaurant_name_distance = float('inf')
-
-        if food_name:
-            food_name_distance_1 = Levenshtein.distance(food_name.lower(), db_food_name.lower(), weights=(0, 1, 1))
-            food_name_distance_2 = Levenshtein.distance(food_name.lower(), db_food_name.lower(), weights=(1, 0, 1))
-            food_name_distance_3 = Levenshtein.distance(food_name.lower(), db_food_name.lower(), weights=(1, 1, 1))
-            food_name_distance = min(food_name_distance_1, food_name_distance_2, food_name_distance_3)
-            
-
-        if restaurant_name:
-            restaurant_name_distance_1 = Levenshtein.distance(restaurant_name.lower(), db_restaurant_name.lower(), weights=(0, 1, 1))
-            restaurant_name_distance_2 = Levenshtein.distance(restaurant_name.lower(), db_restaurant_name.lower(), weights=(1, 0, 1))
-            restaurant_name_distance_3 = Levenshtein.distance(restaurant_name.lower(), db_restaurant_name.lower(), weights=(1, 1, 1))
-            
-            restaurant_name_distance = min(restaurant_name_distance_1, restaurant_name_distance_2, restaurant_name_distance_3)
-            
-        if food_name and restaurant_name:
-            if food_name_distance <= max_distance and restaurant_name_distance <= max_distance:
-                matches.append({
-                    'id': food_id,
-                    'food_name': db_food_name,
-                    'food_category': food_category,
-                    'restaurant_name': db_restaurant_name,
-                    'price': db_price,
-                    'edit_distance': min(food_name_distance, restaurant_name_distance)
-                })
-        elif food_name:
-            if food_name_distance <= max_distance:
-                matches.append({
-                    'id': food_id,
-                    'food_name': db_food_name,
-                    'food_category': food_category,
-                    'restaurant_name': db_restaurant_name,
-                    'price': db_price,
-                    'edit_distance': food_name_distance
-                })
-        elif restaurant_name:
-            if restaurant_name_distance <= max_distance:
-                matches.append({
-                    'id': food_id,
-                    'food_name': db_food_name,
-                    'food_category': food_category,
-                    'restaurant_name': db_restaurant_name,
-                    'price': db_price,
-                    'edit_distance': restaurant_name_distance
-                })
-
-    matches.sort(key=lambda x: x['edit_distance'])
-    connection.close()
-    return matches
+    return get_catalog_index().search(food_name, restaurant_name)
 
 @tool
 def cancel_order(order_id:int, phone_number:str):
@@ -119,25 +171,20 @@ def cancel_order(order_id:int, phone_number:str):
     :param order_id: ID of the order to cancel
     :return: Result message
     """
-    connection = sqlite3.connect('food_orders.db')
-    cursor = connection.cursor()
-    
-    cursor.execute("SELECT status FROM food_orders WHERE id = ? AND person_phone_number = ?", (order_id,phone_number))
-    result = cursor.fetchone()
-    
-    if result is None:
-        return f"Order ID {order_id} from {phone_number} does not exist."
-    
-    current_status = result[0]
-    
-    if current_status == "preparation":
-        cursor.execute("UPDATE food_orders SET status = 'canceled' WHERE id = ?", (order_id,))
-        connection.commit()
-        connection.close()
-        return f"Order ID {order_id} from {phone_number} has been successfully canceled."
-    else:
-        connection.close()
-        return f"Order ID {order_id} from {phone_number} cannot be canceled as it is in '{current_status}' status."
+    with database.transaction():
+        result = database.fetchone(
+            "SELECT status FROM food_orders WHERE id = ? AND person_phone_number = ?", (order_id, phone_number))
+
+        if result is None:
+            return f"Order ID {order_id} from {phone_number} does not exist."
+
+        current_status = result[0]
+
+        if current_status == "preparation":
+            database.execute("UPDATE food_orders SET status = 'canceled' WHERE id = ?", (order_id,))
+            return f"Order ID {order_id} from {phone_number} has been successfully canceled."
+        else:
+            return f"Order ID {order_id} from {phone_number} cannot be canceled as it is in '{current_status}' status."
 
 @tool
 def comment_order(order_id:int, person_name:str ,comment:str):
@@ -148,18 +195,13 @@ def comment_order(order_id:int, person_name:str ,comment:str):
     :param comment: The comment to add or overwrite
     :return: Result message
     """
-    connection = sqlite3.connect('food_orders.db')
-    cursor = connection.cursor()
-    
-    cursor.execute("SELECT id FROM food_orders WHERE id = ?", (order_id,))
-    result = cursor.fetchone()
-    
-    if result is None:
-        return f"Order ID {order_id} does not exist."
-    
-    cursor.execute("UPDATE food_orders SET comment = ? WHERE id = ?", (comment, order_id))
-    connection.commit()
-    connection.close()
+    with database.transaction():
+        result = database.fetchone("SELECT id FROM food_orders WHERE id = ?", (order_id,))
+
+        if result is None:
+            return f"Order ID {order_id} does not exist."
+
+        database.execute("UPDATE food_orders SET comment = ? WHERE id = ?", (comment, order_id))
     return f"Comment for Order ID {order_id} from {person_name} has been updated."
 
 
@@ -184,12 +226,7 @@ def check_order_status(order_id: int):
     """
 
 
-    connection = sqlite3.connect('food_orders.db')
-    cursor = connection.cursor()
-    
-    cursor.execute("SELECT status FROM food_orders WHERE id = ?", (order_id,))
-    result = cursor.fetchone()
-    connection.close()
+    result = database.fetchone("SELECT status FROM food_orders WHERE id = ?", (order_id,))
     if result is None:
         return f"Order ID {order_id} does not exist."
     
@@ -199,6 +236,19 @@ def check_order_status(order_id: int):
 
 
 
+def _run_on_db_pool(db_tool):
+    """Give a database-backed tool an async implementation with an unchanged schema."""
+    async def coroutine(**kwargs):
+        return await database.arun(db_tool.func, **kwargs)
+
+    db_tool.coroutine = coroutine
+    return db_tool
+
+
+for _db_tool in (available_food_search, cancel_order, comment_order, check_order_status):
+    _run_on_db_pool(_db_tool)
+
+
 class CompleteOrEscalate(BaseModel):
     """
     🚀 **CompleteOrEscalate Tool**
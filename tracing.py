@@ -0,0 +1,424 @@
+import atexit
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+from uuid import UUID
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables.config import var_child_runnable_config
+from config import TRACING_ENABLED, TRACE_LOG_PATH
+from llm_cache import CACHE_HIT
+from prompt_cache import _load_encoder, render_prompt
+
+
+ATTEMPT_TAG = re.compile(r"^attempt:(\d+)$")
+DETACHED_RUN = "trace_as"  # metadata key naming a run outside the graph that gets its own record
+LATENCY_WINDOW = 1024  # recent wall times kept per node for the quantiles
+QUANTILES = (0.5, 0.95, 0.99)
+COUNTERS = ("runs", "errors", "wall_seconds", "llm_seconds", "llm_calls", "tool_seconds", "tool_calls",
+            "prompt_tokens", "completion_tokens", "cached_tokens", "retries")
+
+
+class BackgroundWriter:
+    """
+    Hands queued items to `flush(batch)` on a daemon thread, so callbacks running on the
+    event loop never wait on disk. Items queued while a batch is written go in the next
+    one; whatever is still queued at exit is flushed then.
+    """
+
+    _STOP = object()
+
+    def __init__(self, flush: Callable[[list], None], name: str):
+        self.flush = flush
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is self._STOP for item in batch)
+            batch = [item for item in batch if item is not self._STOP]
+            if batch:
+                try:
+                    self.flush(batch)
+                except Exception as e:
+                    print(e)
+            if stop:
+                return
+
+    def close(self, timeout: float = 5.0):
+        """Write what is queued and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+
+
+def node_path(checkpoint_ns: str) -> str:
+    """`doc_retrieval:<task>|filter:<task>` -> `doc_retrieval/filter`."""
+    return "/".join(part.split(":")[0] for part in checkpoint_ns.split("|") if part)
+
+
+def _usage(response: LLMResult) -> Optional[dict]:
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {
+                    "prompt_tokens": usage.get("input_tokens", 0),
+                    "completion_tokens": usage.get("output_tokens", 0),
+                    "cached_tokens": (usage.get("input_token_details") or {}).get("cache_read", 0) or 0,
+                }
+    token_usage = (response.llm_output or {}).get("token_usage")
+    if token_usage:
+        return {
+            "prompt_tokens": token_usage.get("prompt_tokens", 0),
+            "completion_tokens": token_usage.get("completion_tokens", 0),
+            "cached_tokens": (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0,
+        }
+    return None
+
+
+def _from_cache(response: LLMResult) -> bool:
+    return any(
+        (generation.generation_info or {}).get(CACHE_HIT)
+        for generations in response.generations
+        for generation in generations
+    )
+
+
+def _completion_text(response: LLMResult) -> str:
+    parts = []
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            parts.append(generation.text or "")
+            if message is not None and getattr(message, "tool_calls", None):
+                parts.append(json.dumps([call["args"] for call in message.tool_calls]))
+    return "".join(parts)
+
+
+class NodeTracer(BaseCallbackHandler):
+    """
+    Callback that records, per graph node execution, where the time and tokens of a turn went.
+
+    A span is opened for every LangGraph node run (including the nodes of subgraphs, whose
+    path is `parent/child`) and closed with one record:
+
+    - wall_seconds for the node, and the LLM time, call count and time to first token of
+      the chat model calls made directly inside it (nested subgraph nodes keep their own);
+    - prompt, completion and cached tokens, from the provider's usage when it reports it,
+      otherwise estimated with the tokenizer (`estimated: true`);
+    - time spent in tools, and retries (model calls tagged `attempt:N` with N > 0).
+
+    Records are aggregated per node path and appended to `log_path` as JSON lines by a
+    background writer;
+    `report()` returns the aggregate and `prometheus()` renders it for a scrape endpoint.
+    `span()` adds plain functions such as `document_search` to the same records, and every
+    callable in `listeners` receives each record as it is closed (see token_budget.py).
+    """
+
+    # Handle events on the caller's thread, in order, instead of the async manager's executor.
+    run_inline = True
+
+    def __init__(self, log_path: Optional[str] = None):
+        self.log_path = log_path
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._encode = None
+        self._parents = {}   # run_id -> parent run_id, for every chain/tool/model run in flight
+        self._spans = {}     # node run_id -> open span
+        self._llm_runs = {}  # model run_id -> {"span", "start", "first_token", "messages", "retry"}
+        self._tool_runs = {}  # tool run_id -> (span, start)
+        self._totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._ttft = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._writer = None
+        if log_path:
+            if os.path.dirname(log_path):
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            self._writer = BackgroundWriter(self._write, name="trace-writer")
+
+    # -- span bookkeeping -------------------------------------------------------------
+
+    def _span_for(self, run_id: Optional[UUID]) -> Optional[dict]:
+        while run_id is not None:
+            span = self._spans.get(run_id)
+            if span is not None:
+                return span
+            run_id = self._parents.get(run_id)
+        return None
+
+    def _root_of(self, run_id: Optional[UUID]) -> Optional[UUID]:
+        while run_id in self._parents and self._parents[run_id] is not None:
+            run_id = self._parents[run_id]
+        return run_id
+
+    @staticmethod
+    def _new_span(node: str, metadata: dict, turn) -> dict:
+        return {
+            "node": node,
+            "thread_id": metadata.get("thread_id"),
+            "turn": str(turn) if turn else None,
+            "start": time.perf_counter(),
+            "ts": time.time(),
+            "llm_seconds": 0.0,
+            "llm_calls": 0,
+            "ttft_seconds": None,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "estimated": False,
+            "tool_seconds": 0.0,
+            "tool_calls": 0,
+            "retries": 0,
+            "error": None,
+        }
+
+    def _close(self, span: dict):
+        record = {key: value for key, value in span.items() if key != "start"}
+        record["wall_seconds"] = time.perf_counter() - span["start"]
+        node = record["node"]
+        totals = self._totals[node]
+        totals["runs"] += 1
+        totals["errors"] += record["error"] is not None
+        for key in COUNTERS[2:]:
+            totals[key] += record[key]
+        self._latencies[node].append(record["wall_seconds"])
+        if record["ttft_seconds"] is not None:
+            self._ttft[node].append(record["ttft_seconds"])
+        if self._writer is not None:
+            self._writer.put(record)
+        for listener in self.listeners:
+            try:
+                listener(record)
+            except Exception as e:
+                print(e)
+
+    def _write(self, records: list[dict]):
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+
+    # -- graph nodes --------------------------------------------------------------------
+
+    def on_chain_start(self, serialized: dict, inputs: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       tags: Optional[list[str]] = None, metadata: Optional[dict] = None, **kwargs: Any):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            # The node's own run carries its name and a `graph:step:N` tag; runnables inside
+            # the node inherit the metadata but not both.
+            is_node = (
+                node and node != "__start__" and kwargs.get("name") == node
+                and any(tag.startswith("graph:step:") for tag in tags or ())
+            )
+            if is_node:
+                path = node_path(metadata.get("langgraph_checkpoint_ns", "")) or node
+                self._spans[run_id] = self._new_span(path, metadata, self._root_of(parent_run_id))
+            elif metadata.get(DETACHED_RUN) and kwargs.get("name") == metadata[DETACHED_RUN]:
+                # See `detached_config`; runnables inside inherit the metadata but not the name.
+                self._spans[run_id] = self._new_span(metadata[DETACHED_RUN], metadata, None)
+
+    def _end_run(self, run_id: UUID, error: Optional[BaseException] = None):
+        with self._lock:
+            self._parents.pop(run_id, None)
+            span = self._spans.pop(run_id, None)
+            if span is not None:
+                if error is not None:
+                    span["error"] = repr(error)
+                self._close(span)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._end_run(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        # GraphInterrupt (human approval in part_2) ends the node without a failure.
+        self._end_run(run_id, None if type(error).__name__ == "GraphInterrupt" else error)
+
+    # -- chat models --------------------------------------------------------------------
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                            tags: Optional[list[str]] = None, **kwargs: Any):
+        attempts = [int(match.group(1)) for match in map(ATTEMPT_TAG.match, tags or ()) if match]
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            self._llm_runs[run_id] = {
+                "span": self._span_for(parent_run_id),
+                "start": time.perf_counter(),
+                "first_token": None,
+                "messages": messages[0] if messages else [],
+                "retry": bool(attempts) and max(attempts) > 0,
+            }
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any):
+        run = self._llm_runs.get(run_id)
+        if run is not None and run["first_token"] is None:
+            run["first_token"] = time.perf_counter()
+
+    def _estimate(self, text: str) -> int:
+        if self._encode is None:
+            self._encode = _load_encoder()
+        return len(self._encode(text))
+
+    def _end_llm(self, run_id: UUID, response: Optional[LLMResult]):
+        with self._lock:
+            self._parents.pop(run_id, None)
+            run = self._llm_runs.pop(run_id, None)
+        span = run and run["span"]
+        if span is None:
+            return
+        usage = _usage(response) if response is not None else None
+        if response is not None and _from_cache(response):
+            # Served by the local LLM cache: no tokens were sent to the provider.
+            usage = dict.fromkeys(("prompt_tokens", "completion_tokens", "cached_tokens"), 0)
+        estimated = usage is None
+        if estimated:
+            # Streamed OpenAI responses carry no usage unless stream_usage is on.
+            usage = {
+                "prompt_tokens": self._estimate(render_prompt(run["messages"])),
+                "completion_tokens": self._estimate(_completion_text(response)) if response else 0,
+                "cached_tokens": 0,
+            }
+        with self._lock:
+            span["llm_seconds"] += time.perf_counter() - run["start"]
+            span["llm_calls"] += 1
+            span["retries"] += run["retry"]
+            span["estimated"] = span["estimated"] or estimated
+            if run["first_token"] is not None and span["ttft_seconds"] is None:
+                span["ttft_seconds"] = run["first_token"] - span["start"]
+            for key, value in usage.items():
+                span[key] += value
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        self._end_llm(run_id, response)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end_llm(run_id, None)
+
+    # -- tools --------------------------------------------------------------------------
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            self._tool_runs[run_id] = (self._span_for(parent_run_id), time.perf_counter())
+
+    def _end_tool(self, run_id: UUID):
+        with self._lock:
+            self._parents.pop(run_id, None)
+            span, start = self._tool_runs.pop(run_id, (None, None))
+            if span is not None:
+                span["tool_seconds"] += time.perf_counter() - start
+                span["tool_calls"] += 1
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._end_tool(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end_tool(run_id)
+
+    # -- plain functions ----------------------------------------------------------------
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block as its own record, named `<node path>/<name>` when run inside a node."""
+        metadata = (var_child_runnable_config.get() or {}).get("metadata", {})
+        parent = node_path(metadata.get("langgraph_checkpoint_ns", ""))
+        span = self._new_span(f"{parent}/{name}" if parent else name, metadata, None)
+        try:
+            yield span
+        except BaseException as e:
+            span["error"] = repr(e)
+            raise
+        finally:
+            with self._lock:
+                self._close(span)
+
+    def detached_config(self, name: str, thread_id: Optional[str]) -> dict:
+        """
+        Config for a run outside the graph (e.g. a background summary) so it is recorded as
+        `name`. Its tokens count towards the thread, not towards any turn.
+        """
+        return {"callbacks": [self], "run_name": name, "metadata": {"thread_id": thread_id, DETACHED_RUN: name}}
+
+    def turn_of(self, config: Optional[dict]) -> Optional[str]:
+        """The turn (root run) the runnable with `config` belongs to, as in the records' `turn`."""
+        run_id = getattr((config or {}).get("callbacks"), "parent_run_id", None)
+        if run_id is None:
+            return None
+        with self._lock:
+            turn = self._root_of(run_id)
+        return str(turn) if turn else None
+
+    # -- export -------------------------------------------------------------------------
+
+    def report(self) -> dict:
+        """Per node path: counters, plus wall time and time-to-first-token quantiles."""
+        with self._lock:
+            report = {}
+            for node, totals in self._totals.items():
+                entry = dict(totals)
+                latencies = list(self._latencies[node])
+                entry["wall_quantiles"] = {str(q): float(np.quantile(latencies, q)) for q in QUANTILES} if latencies else {}
+                ttft = list(self._ttft[node])
+                entry["ttft_quantiles"] = {str(q): float(np.quantile(ttft, q)) for q in QUANTILES} if ttft else {}
+                report[node] = entry
+            return report
+
+    def prometheus(self) -> str:
+        """The aggregate in the Prometheus text exposition format."""
+        lines = []
+        report = self.report()
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP foodbot_node_{name} {help_text}")
+            lines.append(f"# TYPE foodbot_node_{name} {kind}")
+            lines.extend(samples)
+
+        def label(node, **extra):
+            pairs = {"node": node, **extra}
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs.items()) + "}"
+
+        for counter in COUNTERS:
+            if counter == "wall_seconds":
+                continue
+            metric(f"{counter}_total", "counter", f"Sum of {counter.replace('_', ' ')} per graph node.",
+                   [f"foodbot_node_{counter}_total{label(node)} {entry[counter]}" for node, entry in report.items()])
+        for name, key, source in (("wall_seconds", "wall_quantiles", "wall_seconds"), ("ttft_seconds", "ttft_quantiles", None)):
+            samples = []
+            for node, entry in report.items():
+                samples += [f"foodbot_node_{name}{label(node, quantile=q)} {v}" for q, v in entry[key].items()]
+                if source:
+                    samples.append(f"foodbot_node_{name}_sum{label(node)} {entry[source]}")
+                    samples.append(f"foodbot_node_{name}_count{label(node)} {entry['runs']}")
+            metric(name, "summary", f"Per graph node {name.replace('_', ' ')} (recent window quantiles).", samples)
+        return "\n".join(lines) + "\n"
+
+
+tracer = NodeTracer(log_path=TRACE_LOG_PATH) if TRACING_ENABLED else None
+
+
+@contextmanager
+def span(name: str):
+    """`tracer.span(name)` when tracing is on, otherwise a no-op."""
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(name) as current:
+        yield current
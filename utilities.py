@@ -1,12 +1,25 @@
 from langchain_core.runnables import RunnableLambda
 from langgraph.prebuilt import ToolNode
-import lancedb
-from langchain_core.runnables import Runnable, RunnableConfig
+from langgraph.utils.runnable import RunnableCallable
+import asyncio
+import importlib
+import threading
+import time
+import weakref
+from datetime import timedelta
+from semantic_cache import SemanticCache
+import tracing
+from token_budget import budget_status, EXHAUSTED
+from retry_policy import RetryPolicy, default_policy, force_tool_choice, node_name, record as record_retry, RETRY, BUDGET
+from config import (
+    DOC_CACHE_SIMILARITY, DOC_CACHE_MAX_ENTRIES, DOC_CACHE_VERSION_CHECK_SECONDS, TOOL_MAX_CONCURRENCY,
+    INTENT_ROUTER_EMBEDDING_MODEL, EMBEDDING_BACKEND,
+)
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
 from typing import Annotated, Literal, Optional
 from langgraph.graph.message import AnyMessage, add_messages
 from langchain_core.messages import ToolMessage, HumanMessage, AIMessage, RemoveMessage
 from typing import Callable
-from lancedb.rerankers import LinearCombinationReranker
 from typing import TypedDict, List
 from pydantic import ValidationError
 
@@ -26,12 +39,66 @@ def handle_tool_error(state) -> dict:
     }
 
 
+class ParallelToolNode(ToolNode):
+    """
+    ToolNode that runs all tool calls of a message concurrently, at most `max_concurrency`
+    at a time. One ToolMessage is returned per call, in call order.
+
+    The sync path uses a thread pool of that size per step. The async path shares one
+    limit per event loop, so concurrent turns share the same slots.
+    """
+
+    def __init__(self, tools: list, *, max_concurrency: int = TOOL_MAX_CONCURRENCY, **kwargs):
+        super().__init__(tools, **kwargs)
+        self.max_concurrency = max(1, max_concurrency)
+        self._slots = weakref.WeakKeyDictionary()  # event loop -> semaphore
+
+    def _func(self, input, config: RunnableConfig, *, store):
+        limit = min(config.get("max_concurrency") or self.max_concurrency, self.max_concurrency)
+        return super()._func(input, {**config, "max_concurrency": limit}, store=store)
+
+    async def _arun_one(self, call, input_type, config: RunnableConfig):
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with slots:
+            return await super()._arun_one(call, input_type, config)
+
+
 def create_tool_node_with_fallback(tools: list) -> dict:
-    return ToolNode(tools).with_fallbacks(
+    return ParallelToolNode(tools).with_fallbacks(
         [RunnableLambda(handle_tool_error)], exception_key="error"
     )
 
 
+def find_tool_call(message, *names: str) -> Optional[dict]:
+    """The first tool call in `message` to one of `names`, or None."""
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        if tool_call["name"] in names:
+            return tool_call
+    return None
+
+
+def skipped_tool_messages(message, handled_id: str) -> list:
+    """
+    ToolMessages for the tool calls in `message` other than `handled_id`. Use them when a
+    handoff or escalation call takes over the turn and the calls made alongside it do not run.
+    Every call still gets an answer, so the history stays valid for the next model call.
+    """
+    return [
+        ToolMessage(
+            content=f"Not run: {tool_call['name']} was called together with another step that took over. "
+            "Call it again if it is still needed.",
+            tool_call_id=tool_call["id"],
+            name=tool_call["name"],
+            role="tool",
+        )
+        for tool_call in getattr(message, "tool_calls", None) or []
+        if tool_call["id"] != handled_id
+    ]
+
+
 def _print_event(events: dict, _printed: set, max_length=1500):
     for message in events.get("messages", []):
         if message.id not in _printed:
@@ -58,29 +125,102 @@ def _print_event(events: dict, _printed: set, max_length=1500):
 
 
 
-reranker = LinearCombinationReranker()
-db = lancedb.connect('./lancedb')
-food_table = db.open_table("food")
-
-
 class SearchResult(TypedDict):
     id: int
     text: str
     _relevance_score: float
 
-def document_search(query:str, min_score:float=0.65)->List[SearchResult]:
-    try:
-        return [item for item in (food_table
-        .search(query, query_type="hybrid")
+
+_doc_store = {}
+_doc_store_lock = threading.Lock()
+
+
+def get_doc_store() -> dict:
+    """
+    LanceDB table, reranker, query embedder and semantic cache, created on first use.
+
+    Processes (or turns) that only touch orders never import lancedb or load the model.
+    """
+    if not _doc_store:
+        with _doc_store_lock:
+            if not _doc_store:
+                import lancedb
+                from lancedb.rerankers import LinearCombinationReranker
+                # Registers the "sentence-transformers-backend" function before tables built with it are opened.
+                from embeddings import get_embedder
+
+                # Re-check the table for new versions (e.g. after parse.py re-ingests) so the
+                # semantic cache below is invalidated instead of serving stale chunks.
+                db = lancedb.connect('./lancedb', read_consistency_interval=timedelta(seconds=DOC_CACHE_VERSION_CHECK_SECONDS))
+                food_table = db.open_table("food")
+                table_embedding = food_table.embedding_functions["vector"].function
+                if EMBEDDING_BACKEND == "torch":
+                    # Same embedding function the table was built with (see parse.py).
+                    embed = lambda query: table_embedding.compute_query_embeddings(query)[0]
+                else:
+                    # Same model on a faster backend (ONNX / int8), so stored vectors stay comparable.
+                    embed = lambda query: get_embedder(table_embedding.name, EMBEDDING_BACKEND).embed_query(query)
+                _doc_store.update(
+                    table=food_table,
+                    reranker=LinearCombinationReranker(),
+                    embed=embed,
+                    cache=SemanticCache(
+                        embed_fn=embed,
+                        version_fn=lambda: food_table.version,
+                        threshold=DOC_CACHE_SIMILARITY,
+                        max_entries=DOC_CACHE_MAX_ENTRIES,
+                    ),
+                )
+    return _doc_store
+
+
+def embed_query(query: str):
+    return get_doc_store()["embed"](query)
+
+
+def embed_text(text: str):
+    """Embedding of `text` from a standalone model; unlike `embed_query`, no table is opened."""
+    from embeddings import get_embedder
+
+    return get_embedder(INTENT_ROUTER_EMBEDDING_MODEL).embed_query(text)
+
+
+def hybrid_search(query:str, vector=None)->List[SearchResult]:
+    # The query vector is passed explicitly so it comes from the configured backend and a
+    # vector already computed for the semantic cache is not computed again.
+    store = get_doc_store()
+    if vector is None:
+        vector = store["embed"](query)
+    return (store["table"]
+        .search(query_type="hybrid")
+        .vector(list(vector))
+        .text(query)
         .limit(10)
-        .rerank(reranker=reranker)
+        .rerank(reranker=store["reranker"])
         .select(["id", "text"])
-        .to_list()) if item["_relevance_score"] > min_score]
+        .to_list())
+
+
+def document_search(query:str, min_score:float=0.65)->List[SearchResult]:
+    try:
+        with tracing.span("document_search"):
+            cache = get_doc_store()["cache"]
+            results, vector = cache.get(query)
+            if results is None:
+                results = hybrid_search(query, vector)
+                cache.put(query, results, vector)
+            return [item for item in results if item["_relevance_score"] > min_score]
     except Exception as e:
         print(e)
         return "NO RESULT"
 
 
+async def adocument_search(query:str, min_score:float=0.65)->List[SearchResult]:
+    # The hybrid search embeds the query on CPU and reads the FTS index; run it
+    # off the event loop so other sessions keep streaming meanwhile.
+    return await asyncio.to_thread(document_search, query, min_score)
+
+
 def update_dialog_stack(left: list[str], right: Optional[str]) -> list[str]:
     """Push or pop the state."""
     
@@ -107,61 +247,190 @@ class State(TypedDict):
     ] = "fetch_user_info"
 
 
-class Assistant:
-    def __init__(self, runnable: Runnable, is_tools_based:bool=False, debug:bool=False):
+class Assistant(RunnableCallable):
+    """
+    Graph node around an agent runnable.
+
+    It is a `RunnableCallable` so LangGraph uses `acall` when the graph runs through
+    `astream`/`ainvoke` and `__call__` when it runs through `stream`/`invoke`.
+
+    Unusable answers (no tool call from a tools-based node, or, in `respond`, tool arguments
+    the validator rejects) are retried under `retry_policy`. A retry resends the original
+    messages: a missing tool call is re-asked with `tool_choice="required"`, a validation
+    error with only the last failed call and its error appended.
+    """
+    def __init__(self, runnable: Runnable, is_tools_based:bool=False, debug:bool=False, retry_policy: RetryPolicy=None):
+        super().__init__(self.__call__, self.acall, trace=False)
         self.runnable = runnable
         self.is_tools_based = is_tools_based
         self.debug = debug
+        self.retry_policy = retry_policy or default_policy
+        self.forced_runnable = force_tool_choice(runnable)
+
+    def _with_config(self, state: State, config: RunnableConfig):
+        configuration = config.get("configurable", {})
+        user_info = configuration.get("user_info", None)
+        # The rolling summary lives in the thread's state; a configurable one takes precedence.
+        summary = configuration.get("summary", None) or state.get("summary")
+        return {**state, "user_info": user_info, "summary":summary}
+
+    def _needs_retry(self, result):
+        return self.is_tools_based and len(result.tool_calls)==0
+
+    def _nag(self, state):
+        messages = state["messages"] + [HumanMessage(content="Answer with a real output!")]
+        return {**state, "messages": messages}
+
+    def _retry_call(self, state):
+        """The runnable and input for a retry after a missing tool call."""
+        if self.forced_runnable is not None:
+            return self.forced_runnable, state
+        # Models without bound tools cannot be forced; the reminder is added to the original
+        # messages only, so it never accumulates over retries.
+        return self.runnable, self._nag(state)
+
+    def _retry_delay(self, retry, started, config, reason):
+        """Seconds to wait before retry number `retry`, or None to keep the answer we have."""
+        if budget_status(config) == EXHAUSTED:
+            # A thread past its token budget gets the answer it has instead of another attempt.
+            outcome, delay = BUDGET, 0.0
+        else:
+            outcome, delay = self.retry_policy.decide(retry, started)
+        record_retry(node_name(config), reason, outcome)
+        return delay if outcome == RETRY else None
+
     def __call__(self, state: State, config: RunnableConfig):
-        loop = 0
-        while True:
-            configuration = config.get("configurable", {})
-            user_info = configuration.get("user_info", None)
-            summary = configuration.get("summary", None)
-            state = {**state, "user_info": user_info, "summary":summary}
-
-            result = self.runnable.invoke(state)
-
-            # if self.debug:
-            #     print("*"*100)
-            #     print(result)
-            #     print("*"*100)
-
-            if self.is_tools_based and len(result.tool_calls)==0:
-                messages = state["messages"] + [HumanMessage(content="Answer with a real output!")]
-                state = {**state, "messages": messages}
-                loop += 1
-                if loop > 3:
-                    break
-            else:
+        started = time.perf_counter()
+        state = self._with_config(state, config)
+        result = self.runnable.invoke(state, {"tags": ["attempt:0"]})
+        retry = 0
+        while self._needs_retry(result):
+            retry += 1
+            delay = self._retry_delay(retry, started, config, "no_tool_call")
+            if delay is None:
                 break
+            time.sleep(delay)
+            runnable, retry_state = self._retry_call(state)
+            result = runnable.invoke(retry_state, {"tags": [f"attempt:{retry}"]})
         return {"messages": result}
-    
+
+    async def acall(self, state: State, config: RunnableConfig):
+        started = time.perf_counter()
+        state = self._with_config(state, config)
+        result = await self.runnable.ainvoke(state, {"tags": ["attempt:0"]})
+        retry = 0
+        while self._needs_retry(result):
+            retry += 1
+            delay = self._retry_delay(retry, started, config, "no_tool_call")
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            runnable, retry_state = self._retry_call(state)
+            result = await runnable.ainvoke(retry_state, {"tags": [f"attempt:{retry}"]})
+        return {"messages": result}
+
+    def _validation_retry(self, messages, response, validator, error):
+        return messages + [
+            response,
+            *[
+                ToolMessage(
+                    content=f"{repr(error)}\n\nPay close attention to the function schema.\n\n"
+                    + validator.schema_json()
+                    + " Respond by fixing all validation errors.",
+                    tool_call_id=tool_call["id"],
+                )
+                for tool_call in response.tool_calls
+            ],
+        ]
+
+    def _validation_error(self, response, validator):
+        if validator is None:
+            return None
+        try:
+            validator.invoke(response)
+        except (ValidationError, ValueError, KeyError) as e:
+            # KeyError: a call to a tool the validator does not know.
+            return e
+        return None
+
+    def _respond_retry(self, messages, response, validator):
+        """`(reason, runnable, input)` to retry an unusable `respond` answer with, or None."""
+        if self._needs_retry(response):
+            runnable, retry_state = self._retry_call({"messages": messages})
+            return "no_tool_call", runnable, retry_state
+        error = self._validation_error(response, validator)
+        if error is not None:
+            return "validation_error", self.runnable, {"messages": self._validation_retry(messages, response, validator, error)}
+        return None
+
     def respond(self, state: dict, validator=None):
-        response = []
-        for attempt in range(3):
-            response = self.runnable.invoke(
-                {"messages": state["messages"]}, {"tags": [f"attempt:{attempt}"]}
-            )
-            try:
-                if validator:
-                    validator.invoke(response)
-                return {"messages": response}
-            except ValidationError as e:
-                state = state + [
-                    response,
-                    ToolMessage(
-                        content=f"{repr(e)}\n\nPay close attention to the function schema.\n\n"
-                        + validator.schema_json()
-                        + " Respond by fixing all validation errors.",
-                        tool_call_id=response.tool_calls[0]["id"],
-                    ),
-                ]
+        started = time.perf_counter()
+        config = ensure_config()
+        messages = state["messages"]
+        response = self.runnable.invoke({"messages": messages}, {"tags": ["attempt:0"]})
+        retry = 0
+        while (retry_call := self._respond_retry(messages, response, validator)) is not None:
+            reason, runnable, retry_input = retry_call
+            retry += 1
+            delay = self._retry_delay(retry, started, config, reason)
+            if delay is None:
+                break
+            time.sleep(delay)
+            response = runnable.invoke(retry_input, {"tags": [f"attempt:{retry}"]})
         return {"messages": response}
 
-def create_entry_node(assistant_name: str, new_dialog_state: str) -> Callable:
+    async def arespond(self, state: dict, validator=None):
+        started = time.perf_counter()
+        config = ensure_config()
+        messages = state["messages"]
+        response = await self.runnable.ainvoke({"messages": messages}, {"tags": ["attempt:0"]})
+        retry = 0
+        while (retry_call := self._respond_retry(messages, response, validator)) is not None:
+            reason, runnable, retry_input = retry_call
+            retry += 1
+            delay = self._retry_delay(retry, started, config, reason)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            response = await runnable.ainvoke(retry_input, {"tags": [f"attempt:{retry}"]})
+        return {"messages": response}
+
+class LazySubgraph(RunnableCallable):
+    """
+    Graph node that imports and compiles a subgraph the first time a turn reaches it.
+
+    The subgraph runs with the node's config, so it shares the parent's checkpointer,
+    callbacks and streaming exactly as when it is added to the graph directly.
+    """
+    def __init__(self, module: str, attribute: str):
+        super().__init__(self._invoke, self._ainvoke, trace=False)
+        self.module = module
+        self.attribute = attribute
+        self._graph = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._graph is None:
+            with self._lock:
+                if self._graph is None:
+                    self._graph = getattr(importlib.import_module(self.module), self.attribute)
+        return self._graph
+
+    def _invoke(self, state: State, config: RunnableConfig):
+        return self.load().invoke(state, config)
+
+    async def _ainvoke(self, state: State, config: RunnableConfig):
+        # Importing the module compiles the graph; keep that off the event loop.
+        graph = self._graph or await asyncio.to_thread(self.load)
+        return await graph.ainvoke(state, config)
+
+
+def create_entry_node(assistant_name: str, new_dialog_state: str, tool_name: Optional[str] = None) -> Callable:
+    """Entry node answering the `tool_name` call (default: the first) that hands the turn over."""
     def entry_node(state: State) -> dict:
-        tool_call_id = state["messages"][-1].tool_calls[0]["id"]
+        message = state["messages"][-1]
+        tool_call = (tool_name and find_tool_call(message, tool_name)) or message.tool_calls[0]
+        tool_call_id = tool_call["id"]
         return {
             "messages": [
                 ToolMessage(
@@ -173,8 +442,8 @@ def create_entry_node(assistant_name: str, new_dialog_state: str) -> Callable:
     tool_call_id=tool_call_id,
     name=assistant_name,
     role="tool"
-)
-
+),
+                *skipped_tool_messages(message, tool_call_id),
             ],
             "dialog_state": new_dialog_state,
         }
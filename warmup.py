@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from typing import Callable
+from config import WARMUP_ON_STARTUP
+
+
+_lock = threading.Lock()
+# "disabled": no warm-up will run, so the worker is ready as is and warms up lazily.
+_status = {"state": "cold" if WARMUP_ON_STARTUP else "disabled", "started_at": None, "finished_at": None, "steps": {}}
+
+
+def _load_embedding_model():
+    from utilities import embed_query
+
+    embed_query("warm up")
+
+
+def _hybrid_search():
+    # Bypasses the semantic cache so the FTS reader and reranker really run.
+    from utilities import hybrid_search
+
+    hybrid_search("warm up")
+
+
+def _touch_catalog():
+    import database
+    from catalog_index import get_catalog_index
+
+    database.fetchone("SELECT 1 FROM food_orders LIMIT 1")
+    get_catalog_index()
+
+
+def _open_llm_client():
+    from config import llm
+
+    # Listing models costs no tokens but opens the TLS connection in the client's pool.
+    llm.root_client.models.list()
+
+
+async def _aopen_llm_client():
+    from config import llm
+
+    # The async pool belongs to the event loop it is used on, so this runs on the app's loop.
+    await llm.root_async_client.models.list()
+
+
+BLOCKING_STEPS: list[tuple[str, Callable]] = [
+    ("embedding_model", _load_embedding_model),
+    ("hybrid_search", _hybrid_search),
+    ("sqlite_catalog", _touch_catalog),
+    ("llm_client", _open_llm_client),
+]
+
+
+def _run_step(name: str, func: Callable):
+    start = time.perf_counter()
+    error = None
+    try:
+        func()
+    except Exception as e:
+        error = repr(e)
+    _record(name, time.perf_counter() - start, error)
+
+
+def _record(name: str, seconds: float, error):
+    with _lock:
+        _status["steps"][name] = {"seconds": round(seconds, 3), "ok": error is None, "error": error}
+
+
+def _begin() -> bool:
+    with _lock:
+        if _status["state"] not in ("cold", "disabled"):
+            return False
+        _status["state"] = "warming"
+        _status["started_at"] = time.time()
+        return True
+
+
+def _finish():
+    with _lock:
+        _status["state"] = "warm"
+        _status["finished_at"] = time.time()
+
+
+def run():
+    """Run every warm-up step in this thread. A failing step is recorded, not raised."""
+    if not _begin():
+        return
+    for name, func in BLOCKING_STEPS:
+        _run_step(name, func)
+    _finish()
+
+
+async def arun():
+    """Warm up from the app's event loop: blocking steps in a thread, then the async LLM pool."""
+    if not _begin():
+        return
+    for name, func in BLOCKING_STEPS:
+        await asyncio.to_thread(_run_step, name, func)
+    start = time.perf_counter()
+    try:
+        await _aopen_llm_client()
+        error = None
+    except Exception as e:
+        error = repr(e)
+    _record("llm_async_client", time.perf_counter() - start, error)
+    _finish()
+
+
+def start() -> threading.Thread:
+    """Run the warm-up in a daemon thread so the server accepts connections meanwhile."""
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def status() -> dict:
+    """
+    Readiness report: `ready` once every step has run (or at once when warm-up is
+    disabled), plus per-step timings.
+
+    Steps that failed are reported with their error; the worker still counts as ready
+    because the request path retries the same work lazily.
+    """
+    with _lock:
+        steps = {name: dict(step) for name, step in _status["steps"].items()}
+        started, finished = _status["started_at"], _status["finished_at"]
+        return {
+            "ready": _status["state"] in ("warm", "disabled"),
+            "state": _status["state"],
+            "total_seconds": round(finished - started, 3) if finished else None,
+            "steps": steps,
+        }
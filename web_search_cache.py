@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+import database
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS web_search_cache (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS web_search_cache_last_used ON web_search_cache (last_used_at);
+"""
+
+
+def normalize_query(query: str) -> str:
+    """The query's words, case-folded and Unicode-normalized: "Best  pizza?" -> "best pizza"."""
+    words = re.findall(r"\w+", unicodedata.normalize("NFKC", query).casefold())
+    return " ".join(words) or query.strip()
+
+
+class WebSearchCache:
+    """
+    Local, disk-backed cache of web search results, shared by every search tool.
+
+    Results are stored per normalized query and `namespace` (provider and result count), so
+    queries differing only in case, punctuation or spacing share an entry. Entries older
+    than `ttl` seconds are ignored and removed; past `max_entries` the least recently used
+    go. While a query is being fetched, identical queries from other threads or tasks wait
+    for that call instead of starting their own.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: int = 5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._eviction = database.LRUEviction("web_search_cache", max_entries)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future of the running search
+        self._stats = {"hits": 0, "misses": 0, "deduplicated": 0, "expired": 0, "evictions": 0, "uncached": 0}
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = database.connect(self.path)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _key(namespace: str, query: str) -> str:
+        return hashlib.sha256(f"{namespace}\x00{normalize_query(query)}".encode()).hexdigest()
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def lookup(self, key: str):
+        connection = self._connection()
+        row = connection.execute("SELECT created_at, value FROM web_search_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if self.ttl is not None and row[0] + self.ttl < now:
+            connection.execute("DELETE FROM web_search_cache WHERE key = ?", (key,))
+            self._count("expired")
+            return None
+        connection.execute("UPDATE web_search_cache SET last_used_at = ? WHERE key = ?", (now, key))
+        return tuple(json.loads(row[1]))
+
+    def update(self, key: str, query: str, value: tuple):
+        # Failed searches come back as an error string instead of a result list; keep those out.
+        if not isinstance(value[0], list):
+            self._count("uncached")
+            return
+        connection = self._connection()
+        now = time.time()
+        connection.execute(
+            "INSERT OR REPLACE INTO web_search_cache (key, query, created_at, last_used_at, value) VALUES (?, ?, ?, ?, ?)",
+            (key, normalize_query(query), now, now, json.dumps(value, default=str)),
+        )
+        self._evict(connection)
+
+    def _store(self, key: str, query: str, value: tuple):
+        # A failed cache write (e.g. "database is locked") must not fail the search itself.
+        try:
+            self.update(key, query, value)
+        except Exception as e:
+            print(e)
+
+    def _evict(self, connection):
+        evicted = self._eviction.after_write(connection)
+        if evicted:
+            self._count("evictions", evicted)
+
+    def _claim(self, key: str):
+        """`(future, True)` if the caller should run the search, or the running one's future."""
+        with self._lock:
+            if key in self._inflight:
+                self._stats["deduplicated"] += 1
+                return self._inflight[key], False
+            future = self._inflight[key] = Future()
+            self._stats["misses"] += 1
+            return future, True
+
+    def _release(self, key: str, future: Future, value=None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def search(self, namespace: str, query: str, run: Callable[[], tuple]) -> tuple:
+        """The cached `(results, raw)` for `query`, calling `run()` on a miss."""
+        key = self._key(namespace, query)
+        value = self.lookup(key)
+        if value is not None:
+            self._count("hits")
+            return value
+        future, leader = self._claim(key)
+        if not leader:
+            return future.result()
+        try:
+            value = run()
+        except BaseException as e:
+            self._release(key, future, error=e)
+            raise
+        try:
+            self._store(key, query, value)
+        finally:
+            # Waiting callers get the result even if it could not be cached.
+            self._release(key, future, value)
+        return value
+
+    async def asearch(self, namespace: str, query: str, run: Callable[[], Awaitable[tuple]]) -> tuple:
+        key = self._key(namespace, query)
+        value = self.lookup(key)
+        if value is not None:
+            self._count("hits")
+            return value
+        future, leader = self._claim(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await run()
+        except BaseException as e:
+            self._release(key, future, error=e)
+            raise
+        try:
+            self._store(key, query, value)
+        finally:
+            # Waiting callers get the result even if it could not be cached.
+            self._release(key, future, value)
+        return value
+
+    def clear(self):
+        self._connection().execute("DELETE FROM web_search_cache")
+
+    def stats(self) -> dict:
+        """Counters since start-up; `hit_ratio` is the share of searches served without an API call."""
+        with self._lock:
+            searches = self._stats["hits"] + self._stats["deduplicated"] + self._stats["misses"]
+            saved = self._stats["hits"] + self._stats["deduplicated"]
+            return {**self._stats, "searches": searches, "hit_ratio": saved / searches if searches else 0.0}
+
+    def prometheus(self) -> str:
+        stats = self.stats()
+        lines = [
+            "# HELP foodbot_web_search_total Web searches, by how they were served.",
+            "# TYPE foodbot_web_search_total counter",
+        ]
+        lines += [
+            f'foodbot_web_search_total{{result="{result}"}} {stats[name]}'
+            for result, name in (("hit", "hits"), ("deduplicated", "deduplicated"), ("miss", "misses"))
+        ]
+        lines += [
+            "# HELP foodbot_web_search_cache_events_total Web search cache expirations, evictions and uncached errors.",
+            "# TYPE foodbot_web_search_cache_events_total counter",
+        ]
+        lines += [
+            f'foodbot_web_search_cache_events_total{{event="{name}"}} {stats[name]}'
+            for name in ("expired", "evictions", "uncached")
+        ]
+        lines += [
+            "# HELP foodbot_web_search_hit_ratio Share of web searches served without an API call.",
+            "# TYPE foodbot_web_search_hit_ratio gauge",
+            f"foodbot_web_search_hit_ratio {stats['hit_ratio']}",
+        ]
+        return "\n".join(lines) + "\n"